@@ -1,21 +1,59 @@
+import itertools
+
 from sqlalchemy import (
     create_engine,
+    event,
+    Index,
+    insert,
     Integer,
     String,
     Float,
     Date,
     DateTime,
     Column,
+    select,
     text,   # 👈 add this
 )
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, validates
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.sql import func
 
+import atexit
+
 DB_URL = "sqlite:///./app/data/data.db"
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
+# Keep a small persistent pool instead of the SQLite default SingletonThreadPool,
+# so connections (and their page cache + PRAGMA setup) survive across requests.
+engine = create_engine(
+    DB_URL,
+    connect_args={"check_same_thread": False, "timeout": 30},
+    poolclass=QueuePool,
+    pool_size=5,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    """
+    Tune SQLite for our workload (many small writes + concurrent page reads):
+    - WAL lets readers run while the ingest is writing
+    - synchronous=NORMAL avoids an fsync per transaction (safe with WAL)
+    - bigger page cache + in-memory temp store for the aggregation queries
+    """
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-64000")  # ~64 MB
+    cur.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cur.close()
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -23,7 +61,7 @@ class Base(DeclarativeBase):
 class Employee(Base):
     __tablename__ = "employees"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True)
     employee_id = Column(String, index=True)
     name = Column(String)
     cg_email = Column(String, index=True)
@@ -48,11 +86,17 @@ class Employee(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
+    @validates("citi_email")
+    def _normalize_citi_email(self, _key, value):
+        # Normalized at write time so read paths can join/look up with plain
+        # equality instead of lowercasing both sides per row.
+        return value.strip().lower() if value else value
+
 
 class ReconEntry(Base):
     __tablename__ = "recon_entries"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True)
     employee_id = Column(String, index=True)
     month = Column(String, index=True)  # YYYY-MM
     name = Column(String)
@@ -88,12 +132,20 @@ class ReconEntry(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
+    @validates("citi_email")
+    def _normalize_citi_email(self, _key, value):
+        # Same canonical form as Employee/TimeOff, so recon joins on plain
+        # equality and the (citi_email, month) unique key can't case-split.
+        # Core bulk inserts bypass this; the ingest normalizes its own rows.
+        return value.strip().lower() if value else value
+
 
 class CGDaily(Base):
     __tablename__ = "cg_daily"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    citi_email = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    # single-column citi_email index dropped: covered by ix_cg_daily_email_date
+    citi_email = Column(String)
     date = Column(Date, index=True)
     hours = Column(Float, default=0.0)
     project_code = Column(String, index=True)
@@ -102,17 +154,35 @@ class CGDaily(Base):
 class CITIDaily(Base):
     __tablename__ = "citi_daily"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    citi_email = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    # single-column citi_email index dropped: covered by ix_citi_daily_email_date
+    citi_email = Column(String)
     date = Column(Date, index=True)
     hours = Column(Float, default=0.0)
     project_code = Column(String, index=True)
 
 
+# Composite indexes matching the real query patterns: SQLite can only use one
+# index per table per query, and the hot paths filter on these column pairs.
+# The daily tables get their (citi_email, date, project_code) unique key in
+# init_db(), which doubles as the composite lookup index.
+# Unique: the app keys recon rows by (citi_email, month) — uploads dedupe
+# and delete-then-insert per month, so duplicates were never meaningful.
+# Partial so legacy rows with a blank email can't collide with each other.
+Index(
+    "uq_recon_email_month",
+    ReconEntry.citi_email,
+    ReconEntry.month,
+    unique=True,
+    sqlite_where=func.coalesce(ReconEntry.citi_email, "") != "",
+)
+Index("ix_recon_month_project", ReconEntry.month, ReconEntry.project_code)
+
+
 class TimeOff(Base):
     __tablename__ = "time_off"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True)
     # optional FK to employees.id (not enforced)
     employee_id = Column(Integer, nullable=True)
     citi_email = Column(String, index=True)
@@ -130,24 +200,218 @@ class TimeOff(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
+    @validates("citi_email")
+    def _normalize_citi_email(self, _key, value):
+        # Same write-time normalization as Employee.citi_email.
+        return value.strip().lower() if value else value
+
+
+# Time-off lookups always filter status (usually with an email, often with a
+# year window on start_date): one composite index serves all three shapes.
+Index(
+    "ix_timeoff_email_status_start",
+    TimeOff.citi_email,
+    TimeOff.status,
+    TimeOff.start_date,
+)
+
+# Chatbot-generated SQL routinely filters a month by reconciled_status.
+Index("ix_recon_month_status", ReconEntry.month, ReconEntry.reconciled_status)
+
+# Duplicate employee records are an application bug the dedup endpoint mops
+# up; this makes the database reject them outright. Partial so rows without
+# an email (bare skeletons) stay unconstrained.
+Index(
+    "ux_emp_citi_email_lower",
+    func.lower(Employee.citi_email),
+    unique=True,
+    sqlite_where=func.coalesce(Employee.citi_email, "") != "",
+)
+
+
+def bulk_insert(db, model, rows, chunk: int = 1000):
+    """
+    Insert mapping dicts for `model` through Core executemany in fixed-size
+    chunks, so peak memory stays O(chunk) regardless of how many rows the
+    workbook produces. Caller owns the commit.
+    """
+    it = iter(rows)
+    while True:
+        batch = list(itertools.islice(it, chunk))
+        if not batch:
+            break
+        db.execute(insert(model), batch)
+
+
+def upsert_daily(db, model, rows, chunk: int = 1000):
+    """
+    UPSERT daily-hours mapping dicts for CGDaily/CITIDaily on the
+    (citi_email, date, project_code) key: one statement per chunk instead of
+    a SELECT-then-INSERT/UPDATE pair per row, and re-ingesting the same
+    month is idempotent. Caller owns the commit.
+    """
+    it = iter(rows)
+    while True:
+        batch = list(itertools.islice(it, chunk))
+        if not batch:
+            break
+        stmt = sqlite_insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["citi_email", "date", "project_code"],
+            set_={"hours": stmt.excluded.hours},
+        )
+        db.execute(stmt, batch)
+
+
+def iter_recon(month: str, chunk: int = 500):
+    """
+    Stream ReconEntry rows for a month in fixed-size batches instead of
+    materialising the whole result set. Keeps peak memory O(chunk) even for
+    months with years of backfilled history.
+    """
+    with SessionLocal() as s:
+        stmt = (
+            select(ReconEntry)
+            .where(ReconEntry.month == month)
+            .execution_options(stream_results=True, yield_per=chunk)
+        )
+        for row in s.scalars(stmt):
+            yield row
+
 
 def init_db():
     # Create any missing tables
     Base.metadata.create_all(bind=engine)
 
     # === Lightweight migration for existing databases ===
-    # 1) Ensure employees.annual_leave_allowance exists
-    with engine.connect() as conn:
-        res = conn.execute(text("PRAGMA table_info(employees)"))
-        cols = [row[1] for row in res]  # row[1] is column name
+    # 1) Ensure employees.annual_leave_allowance exists.
+    #    Run check-and-alter inside one transaction and tolerate the
+    #    duplicate-column error, so two workers booting at once can't crash
+    #    each other racing the ALTER.
+    with engine.begin() as conn:
+        cols = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(employees)")}
         if "annual_leave_allowance" not in cols:
-            conn.execute(
-                text(
+            try:
+                conn.exec_driver_sql(
                     "ALTER TABLE employees "
                     "ADD COLUMN annual_leave_allowance INTEGER DEFAULT 15"
                 )
-            )
+            except OperationalError as e:
+                if "duplicate column" not in str(e).lower():
+                    raise
 
     # 2) Ensure time_off table exists (if you added it after initial DB)
     Base.metadata.create_all(bind=engine)
 
+    # Drop leftover duplicate PK indexes from when the id columns declared
+    # index=True (the PK itself is already the rowid B-tree).
+    with engine.begin() as conn:
+        for ix in (
+            "ix_employees_id",
+            "ix_recon_entries_id",
+            "ix_time_off_id",
+            # superseded by ix_timeoff_email_status_start
+            "ix_timeoff_email_status",
+            # superseded by write-time email normalization + plain equality
+            "ix_emp_lower_email",
+            # superseded by the unique uq_recon_email_month below
+            "ix_recon_email_month",
+        ):
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {ix}")
+        # create_all skips indexes on pre-existing tables, so make sure older
+        # databases pick up the composite indexes too.
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_timeoff_email_status_start "
+            "ON time_off(citi_email, status, start_date)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_recon_month_status "
+            "ON recon_entries(month, reconciled_status)"
+        )
+        # Backfill the write-time normalization for rows inserted before the
+        # validators existed, so equality joins on citi_email stay exact.
+        conn.exec_driver_sql(
+            "UPDATE employees SET citi_email = LOWER(TRIM(citi_email)) "
+            "WHERE citi_email IS NOT NULL "
+            "AND citi_email != LOWER(TRIM(citi_email))"
+        )
+        conn.exec_driver_sql(
+            "UPDATE time_off SET citi_email = LOWER(TRIM(citi_email)) "
+            "WHERE citi_email IS NOT NULL "
+            "AND citi_email != LOWER(TRIM(citi_email))"
+        )
+        # Dedupe (keep the oldest row per email) before the unique index so
+        # it can always be built on databases that predate the constraint —
+        # same pattern as the daily-table keys below.
+        conn.exec_driver_sql(
+            "DELETE FROM employees WHERE id NOT IN ("
+            "SELECT MIN(id) FROM employees "
+            "GROUP BY COALESCE(NULLIF(LOWER(citi_email), ''), id))"
+        )
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_emp_citi_email_lower "
+            "ON employees(LOWER(citi_email)) "
+            "WHERE COALESCE(citi_email, '') != ''"
+        )
+        # Recon rows are keyed by (citi_email, month); keep the newest row
+        # per key before enforcing it, mirroring the daily tables. Dedup on
+        # the lowercased email and only then normalize, so the backfill
+        # UPDATE can't collide with the unique index if it already exists.
+        conn.exec_driver_sql(
+            "DELETE FROM recon_entries WHERE COALESCE(citi_email, '') != '' "
+            "AND id NOT IN ("
+            "SELECT MAX(id) FROM recon_entries "
+            "WHERE COALESCE(citi_email, '') != '' "
+            "GROUP BY LOWER(TRIM(citi_email)), month)"
+        )
+        conn.exec_driver_sql(
+            "UPDATE recon_entries SET citi_email = LOWER(TRIM(citi_email)) "
+            "WHERE citi_email IS NOT NULL "
+            "AND citi_email != LOWER(TRIM(citi_email))"
+        )
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_recon_email_month "
+            "ON recon_entries(citi_email, month) "
+            "WHERE COALESCE(citi_email, '') != ''"
+        )
+
+    # 3) Unique key for the daily tables so ingest can use native UPSERT.
+    #    Dedupe first (keep the latest row, grouping on the lowered email so
+    #    case variants collapse too), then normalize legacy emails — in that
+    #    order the UPDATE can't collide with an already-built key — and only
+    #    then create the index on databases that predate the constraint.
+    with engine.begin() as conn:
+        for table in ("cg_daily", "citi_daily"):
+            conn.exec_driver_sql(
+                f"DELETE FROM {table} WHERE id NOT IN ("
+                f"SELECT MAX(id) FROM {table} "
+                f"GROUP BY LOWER(TRIM(citi_email)), date, project_code)"
+            )
+            conn.exec_driver_sql(
+                f"UPDATE {table} SET citi_email = LOWER(TRIM(citi_email)) "
+                f"WHERE citi_email IS NOT NULL "
+                f"AND citi_email != LOWER(TRIM(citi_email))"
+            )
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS ix_{table}_email_date")
+            conn.exec_driver_sql(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_key "
+                f"ON {table}(citi_email, date, project_code)"
+            )
+
+    # Refresh planner statistics so index choices stay good as tables grow
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA optimize"))
+
+
+def _optimize_and_dispose():
+    """Run PRAGMA optimize once more on shutdown, then release the pool."""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("PRAGMA optimize"))
+    except Exception:
+        pass
+    engine.dispose()
+
+
+atexit.register(_optimize_and_dispose)
+
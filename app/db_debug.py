@@ -0,0 +1,34 @@
+"""
+Development/test helpers for query-count regression checks.
+
+Not imported by the app itself — tests use count_queries to pin how many
+statements an endpoint or helper is allowed to issue, so accidental N+1
+patterns fail at PR time instead of showing up as slow dashboards.
+"""
+
+import contextlib
+
+from sqlalchemy import event
+
+
+@contextlib.contextmanager
+def count_queries(session):
+    """
+    Collect the SQL statements executed on the session's bind while the
+    block runs. Usage:
+
+        with count_queries(session) as queries:
+            build_dashboard(session, month)
+        assert len(queries) <= 2
+    """
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    bind = session.get_bind()
+    event.listen(bind, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", _record)
@@ -1,13 +1,68 @@
+import functools
+import hashlib
+import json
 import os
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
-load_dotenv()
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    def _json_loads(data):
+        return json.loads(data)
+
 
 API_BASE = "https://api.generative.engine.capgemini.com/v2/llm/invoke"
-API_KEY = os.getenv("CAPG_LLM_API_KEY", "CHANGE_ME")
+# Sentinel kept for callers that import API_KEY and pass it through; the real
+# key is resolved lazily (and cached) on first use so importing this module
+# doesn't stat/parse .env.
+API_KEY = "CHANGE_ME"
 DEFAULT_MODEL = "anthropic.claude-3-5-sonnet-20241022-v2:0"
 
+
+@functools.lru_cache(maxsize=1)
+def _resolved_api_key(explicit: str | None = None) -> str:
+    if explicit and explicit != "CHANGE_ME":
+        return explicit
+    load_dotenv()
+    key = os.getenv("CAPG_LLM_API_KEY")
+    if not key or key == "CHANGE_ME":
+        raise RuntimeError(
+            "CAPG_LLM_API_KEY is not set. Create a .env file with CAPG_LLM_API_KEY=..."
+        )
+    return key
+
+# Shared session: keeps the TLS connection alive between calls and retries
+# transient gateway errors with backoff instead of failing the whole request.
+_session = requests.Session()
+_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["POST"]),
+        ),
+    ),
+)
+
 SYSTEM_PROMPT = (
     "You are a senior portfolio manager assistant for Capgemini working on Citi accounts. "
     "You see summarised timesheet, reconciliation and billing data. "
@@ -16,21 +71,23 @@ SYSTEM_PROMPT = (
 )
 
 
-def call_llm(
-    api_key: str,
-    prompt: str,
-    model_name: str = DEFAULT_MODEL,
-    system_prompt: str = SYSTEM_PROMPT,
-    temperature: float = 0.3,
-    top_p: float = 0.9,
-    max_tokens: int = 512,
-):
-    if not api_key or api_key == "CHANGE_ME":
-        raise RuntimeError(
-            "CAPG_LLM_API_KEY is not set. Create a .env file with CAPG_LLM_API_KEY=..."
-        )
+# Async client for fan-out use cases (e.g. one summary per employee):
+# N concurrent calls finish in ~max(latency) instead of sum(latency).
+_aclient = httpx.AsyncClient(
+    timeout=60.0,
+    limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+)
 
-    payload = {
+
+def _build_payload(
+    prompt: str,
+    model_name: str,
+    system_prompt: str,
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+) -> dict:
+    return {
         "action": "run",
         "modelInterface": "langchain",
         "data": {
@@ -49,12 +106,99 @@ def call_llm(
         },
     }
 
-    headers = {
+
+# In-memory response cache. At low temperature the same prompt yields near-
+# identical answers, and the dashboards regenerate the same summaries many
+# times per session — a hit returns in microseconds instead of seconds.
+_response_cache: dict[str, dict] = {}
+_CACHE_MAX_ENTRIES = 512
+_CACHE_TEMPERATURE_CEILING = 0.7  # above this, answers vary; don't cache
+
+
+def _cache_key(
+    model_name: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+) -> str:
+    raw = json.dumps(
+        [model_name, system_prompt, prompt, round(temperature, 3), round(top_p, 3), max_tokens],
+        sort_keys=True,
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _cache_put(key: str, response: dict):
+    if len(_response_cache) >= _CACHE_MAX_ENTRIES:
+        # drop the oldest entry (insertion order) to bound memory
+        _response_cache.pop(next(iter(_response_cache)))
+    _response_cache[key] = response
+
+
+def _build_headers(api_key: str | None) -> dict:
+    return {
         "accept": "application/json",
         "Content-Type": "application/json",
-        "x-api-key": api_key,
+        "x-api-key": _resolved_api_key(api_key or None),
     }
 
-    resp = requests.post(API_BASE, headers=headers, json=payload, timeout=60)
+
+def call_llm(
+    api_key: str,
+    prompt: str,
+    model_name: str = DEFAULT_MODEL,
+    system_prompt: str = SYSTEM_PROMPT,
+    temperature: float = 0.3,
+    top_p: float = 0.9,
+    max_tokens: int = 512,
+):
+    headers = _build_headers(api_key)
+    payload = _build_payload(
+        prompt, model_name, system_prompt, temperature, top_p, max_tokens
+    )
+
+    cacheable = temperature <= _CACHE_TEMPERATURE_CEILING
+    key = _cache_key(model_name, system_prompt, prompt, temperature, top_p, max_tokens)
+    if cacheable and key in _response_cache:
+        return _response_cache[key]
+
+    resp = _session.post(
+        API_BASE, headers=headers, data=_json_dumps(payload), timeout=60
+    )
+    resp.raise_for_status()
+    data = _json_loads(resp.content)
+    if cacheable:
+        _cache_put(key, data)
+    return data
+
+
+async def call_llm_async(
+    api_key: str,
+    prompt: str,
+    model_name: str = DEFAULT_MODEL,
+    system_prompt: str = SYSTEM_PROMPT,
+    temperature: float = 0.3,
+    top_p: float = 0.9,
+    max_tokens: int = 512,
+):
+    """Async variant of call_llm; batch with asyncio.gather for parallel calls."""
+    headers = _build_headers(api_key)
+    payload = _build_payload(
+        prompt, model_name, system_prompt, temperature, top_p, max_tokens
+    )
+
+    cacheable = temperature <= _CACHE_TEMPERATURE_CEILING
+    key = _cache_key(model_name, system_prompt, prompt, temperature, top_p, max_tokens)
+    if cacheable and key in _response_cache:
+        return _response_cache[key]
+
+    resp = await _aclient.post(
+        API_BASE, headers=headers, content=_json_dumps(payload)
+    )
     resp.raise_for_status()
-    return resp.json()
+    data = _json_loads(resp.content)
+    if cacheable:
+        _cache_put(key, data)
+    return data
@@ -1,4 +1,7 @@
+import gzip
+import hashlib
 import json
+import functools
 import math
 import calendar
 import datetime
@@ -15,20 +18,29 @@ from fastapi import (
     Request,
     status,
 )
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    Response,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete, or_, text
+from sqlalchemy import select, delete, func, or_, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
 from fastapi import Body
 
 
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import io
+import tempfile
 from sqlalchemy import text
 
 
@@ -41,16 +53,121 @@ from .db import (
     Employee,
     TimeOff,
     engine,
+    bulk_insert,
+    upsert_daily,
 )
 from .llm_client import call_llm, API_KEY, DEFAULT_MODEL, SYSTEM_PROMPT
+from .queries import (
+    Q_DAILY_BOTH_SYSTEMS,
+    Q_EMPLOYEE_BY_CITI_EMAIL,
+    Q_RECON_REPORT_COLS,
+)
 from .sample_data import ensure_sample_workbook
 
 
+# Prefer the Rust-based calamine reader: it parses xlsx several times faster
+# than openpyxl's full in-memory DOM and with a fraction of the peak memory.
+try:
+    import python_calamine  # noqa: F401
+
+    EXCEL_ENGINE = "calamine"
+    EXCEL_ENGINE_KWARGS: dict = {}
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+    # Read-only streaming mode skips styles/formula parsing and keeps peak
+    # memory flat on big workbooks; data_only returns cached formula values.
+    EXCEL_ENGINE_KWARGS = {"read_only": True, "data_only": True}
+
+# Columns the ingest actually reads, so read_excel can skip everything else
+# instead of parsing every cell into object dtype.
+MONTHLY_SHEET_COLS = {
+    "ID",
+    "Name",
+    "CG Email",
+    "Citi Email",
+    "Month",
+    "Region Code",
+    "Region Name",
+    "Project Name",
+    "Project Code",
+    "ProjectCode",
+    "Proj Code",
+    "Project",
+    "Billing Rate",
+    "Total Hours(CG)",
+    "Submitted Hours(CG)",
+    "Total Hours(Citi)",
+    "Submitted Hours(Citi)",
+    "Submitted On",
+    "Holidays",
+}
+
+DAILY_SHEET_COLS = {
+    "Citi Email",
+    "Date",
+    "Hours",
+    "Project Code",
+    "ProjectCode",
+    "Proj Code",
+    "Project",
+}
+
+# Hours/rates go straight to float so pandas skips type inference and
+# coalesce_num's to_numeric pass is a no-op.
+MONTHLY_SHEET_DTYPES = {
+    "Total Hours(CG)": "float64",
+    "Submitted Hours(CG)": "float64",
+    "Total Hours(Citi)": "float64",
+    "Submitted Hours(Citi)": "float64",
+    "Billing Rate": "float64",
+}
+
+
 APP_DIR = Path(__file__).resolve().parent
 DATA_DIR = APP_DIR / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-app = FastAPI(title="CG × Citi — Timesheet, Billing & Chatbot")
+# orjson encodes the big report/billing payloads several times faster than
+# the stdlib encoder and writes NaN as null natively, so responses built
+# through _json_response skip the recursive sanitize() walk entirely.
+try:
+    import orjson
+
+    class _ORJSONResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    _DEFAULT_RESPONSE_CLASS = _ORJSONResponse
+
+    def _json_response(payload):
+        return _ORJSONResponse(payload)
+
+    def _json_loads(s):
+        return orjson.loads(s)
+
+    def _json_dumps_str(obj) -> str:
+        return orjson.dumps(
+            obj, default=str, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+except ImportError:
+
+    _DEFAULT_RESPONSE_CLASS = JSONResponse
+
+    def _json_response(payload):
+        return JSONResponse(sanitize(payload))
+
+    def _json_loads(s):
+        return json.loads(s)
+
+    def _json_dumps_str(obj) -> str:
+        return json.dumps(obj, default=str)
+
+
+app = FastAPI(
+    title="CG × Citi — Timesheet, Billing & Chatbot",
+    default_response_class=_DEFAULT_RESPONSE_CLASS,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -76,6 +193,11 @@ def get_db():
     db = SessionLocal()
     try:
         yield db
+    except Exception:
+        # Failed requests must not leave half-flushed state behind for the
+        # connection pool to trip over on the next checkout.
+        db.rollback()
+        raise
     finally:
         db.close()
 
@@ -103,6 +225,17 @@ MONTH_MAP = {
 }
 
 
+# Compiled once at import: this runs on every chatbot request, and compiling
+# at the call site repeats the pattern-cache lookup each time. Both month
+# spellings live in one alternation so a single search covers them; on a mixed
+# string the leftmost occurrence wins.
+_MONTH_QUERY_RE = re.compile(
+    r'(?P<word>jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june|july|august|september|october|november|december)\s+(?P<wyear>\d{4})'
+    r'|(?P<year>\d{4})-(?P<mon>\d{1,2})'
+)
+
+
+@functools.lru_cache(maxsize=256)
 def parse_month_from_query(q_lower: str) -> str | None:
     """
     Parse something like:
@@ -111,32 +244,29 @@ def parse_month_from_query(q_lower: str) -> str | None:
     - '2025-11'
     and return 'YYYY-MM' or None.
     """
-    m = re.search(
-        r'(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june|july|august|september|october|november|december)\s+(\d{4})',
-        q_lower,
-    )
-    if m:
-        mon_word = m.group(1)
-        year = int(m.group(2))
-        mon = MONTH_MAP.get(mon_word, 0)
+    m = _MONTH_QUERY_RE.search(q_lower)
+    if not m:
+        return None
+
+    if m.group("word"):
+        mon = MONTH_MAP.get(m.group("word"), 0)
         if mon:
-            return f"{year:04d}-{mon:02d}"
+            return f"{int(m.group('wyear')):04d}-{mon:02d}"
+        return None
 
-    m = re.search(r'(\d{4})-(\d{1,2})', q_lower)
-    if m:
-        year = int(m.group(1))
-        mon = int(m.group(2))
-        if 1 <= mon <= 12:
-            return f"{year:04d}-{mon:02d}"
+    year = int(m.group("year"))
+    mon = int(m.group("mon"))
+    if 1 <= mon <= 12:
+        return f"{year:04d}-{mon:02d}"
 
     return None
 
 
-def is_weekend(dt: datetime.date) -> bool:
-    return dt.weekday() >= 5
-
-
+@functools.lru_cache(maxsize=512)
 def expected_hours_for_month(year: int, month: int, holidays_csv: str | None) -> float:
+    # Callers may pass numpy ints from vectorized frames; normalize so the
+    # date math below and the cache keys see plain ints.
+    year, month = int(year), int(month)
     holidays: set[datetime.date] = set()
     if holidays_csv:
         for tok in str(holidays_csv).split(","):
@@ -147,13 +277,13 @@ def expected_hours_for_month(year: int, month: int, holidays_csv: str | None) ->
                 except Exception:
                     pass
     _, last = calendar.monthrange(year, month)
-    hours = 0
-    for d in range(1, last + 1):
-        day = datetime.date(year, month, d)
-        if is_weekend(day) or day in holidays:
-            continue
-        hours += 8
-    return float(hours)
+    # np.busday_count skips weekends and the listed holidays in one C pass;
+    # the end bound is exclusive, hence last + 1. Weekend holidays and dates
+    # outside the month are ignored, matching the old day-by-day loop.
+    start = datetime.date(year, month, 1)
+    end = start + datetime.timedelta(days=last)
+    holidays_arr = np.array(sorted(holidays), dtype="datetime64[D]")
+    return float(np.busday_count(start, end, holidays=holidays_arr) * 8)
 
 
 def status_from(total: float, submitted: float) -> str:
@@ -165,13 +295,104 @@ def status_from(total: float, submitted: float) -> str:
         return "Partial"
     return "Completed"
 
+# Extraction/cleanup patterns for LLM-generated SQL, compiled once.
+_SQL_JSON_DQ_RE = re.compile(r'"sql"\s*:\s*"(.+?)"', re.DOTALL | re.IGNORECASE)
+_SQL_JSON_SQ_RE = re.compile(r"'sql'\s*:\s*'(.+?)'", re.DOTALL | re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+_NT_RE = re.compile(r"\bn\s+t\b")
+
+# Character-level cleanup (stray backslashes, raw newlines/tabs) in one
+# translate pass instead of chained str.replace calls.
+_CLEAN_TABLE = str.maketrans({"\\": " ", "\n": " ", "\t": " "})
+
+# Post-processing for common LLM mistakes: one alternation regex applied in a
+# single pass, dispatching on the named group that matched. The invented
+# 'projects' join is stripped outright; the rest are constant token rewrites
+# (flags are scoped per branch — the bare-'to.' fix is case-sensitive).
+_SQL_FIXUP_REPLACEMENTS = {
+    # Wrong join on employees.id (recon_entries.employee_id is a business ID)
+    "join_fix": "JOIN recon_entries r ON e.citi_email = r.citi_email",
+    # Invented 'projects' table join — remove the whole clause
+    "projects_join": " ",
+    # Non-existent re.status / recon_entries.status
+    "re_status": "re.reconciled_status",
+    "recon_status": "recon_entries.reconciled_status",
+    # Unnecessary strftime('%Y-%m', ...) on the TEXT month column
+    "strftime_re": "re.month",
+    "strftime_recon": "recon_entries.month",
+    # 'time_off to' aliases clash with the TO keyword
+    "timeoff_alias": "time_off t_off",
+    "to_dot": "t_off.",
+    # Case normalisation for commonly miscased columns
+    "re_sub_hours": "re.submitted_hours_cg",
+    # p.* leftovers from stripped projects joins map to recon alias guesses
+    "p_name": "rg.project_name",
+    "p_code": "rg.project_code",
+    "re_p_name": "re.project_name",
+    "re_p_code": "re.project_code",
+}
+
+_SQL_FIXUP_RE = re.compile(
+    "|".join(
+        [
+            r"(?P<join_fix>(?i:join\s+recon_entries\s+r\s+on\s+e\.id\s*=\s*r\.employee_id))",
+            r"(?P<projects_join>(?is:\s+(?:left\s+)?join\s+projects\s+p\s+on\s+.*?(?=(?:left join|right join|inner join|where|group by|order by|$))))",
+            r"(?P<re_status>(?i:\bre\.status\b))",
+            r"(?P<recon_status>(?i:\brecon_entries\.status\b))",
+            r"(?P<strftime_re>(?i:strftime\(\s*'%Y-%m'\s*,\s*re\.month\s*\)))",
+            r"(?P<strftime_recon>(?i:strftime\(\s*'%Y-%m'\s*,\s*recon_entries\.month\s*\)))",
+            r"(?P<timeoff_alias>(?i:\btime_off\s+to\b))",
+            r"(?P<to_dot>\bto\.)",
+            r"(?P<re_sub_hours>(?i:\bre\.submitted_hours_cg\b))",
+            r"(?P<p_name>(?i:\bp\.project_name\b))",
+            r"(?P<p_code>(?i:\bp\.project_code\b))",
+            r"(?P<re_p_name>(?i:\bre\.project_name\b))",
+            r"(?P<re_p_code>(?i:\bre\.project_code\b))",
+        ]
+    )
+)
+
+
+# Cheap substring hints: every fixup branch requires at least one of these
+# tokens, and most generated SQL contains none of them, so a handful of C-level
+# `in` checks skips the regex machinery entirely on the common clean path.
+_SQL_FIXUP_HINTS = (
+    "e.id",
+    ".status",
+    "strftime",
+    "time_off",
+    "to.",
+    "projects",
+    "p.",
+    "re.",
+)
+
+
+def _apply_sql_fixups(sql: str) -> str:
+    lower = sql.lower()
+    if not any(hint in lower for hint in _SQL_FIXUP_HINTS):
+        return sql
+    return _SQL_FIXUP_RE.sub(
+        lambda m: _SQL_FIXUP_REPLACEMENTS[m.lastgroup], sql
+    )
+
+
 def generate_sql_from_question(question: str, project_code: str | None) -> str:
     """
     Ask the LLM to produce a single safe SQL SELECT statement for SQLite
     against our schema (employees, recon_entries, cg_daily, citi_daily, time_off).
     Robust to non-perfect JSON, and post-processes common mistakes.
+
+    Cleaned SQL is memoized per (whitespace-normalised question,
+    project_code): the generated SQL depends only on the question, so a
+    repeated chatbot question skips the LLM round trip and the cleanup
+    passes entirely. Case is preserved because literal values in the
+    question (emails, project codes) are case-sensitive in the SQL.
     """
-    schema_description = """
+    return _generate_sql_cached(" ".join(question.split()), project_code)
+
+
+_SCHEMA_DESCRIPTION = """
 We are using SQLite. The relevant tables are:
 
 Table employees:
@@ -246,14 +467,7 @@ VERY IMPORTANT:
 - Project code and project name always come from recon_entries.project_code and recon_entries.project_name.
 """
 
-    project_filter_hint = (
-        f"\nThe UI has an optional project filter currently set to: {project_code}.\n"
-        "If this is relevant, you may add a condition like `AND project_code = '<code>'`.\n"
-        if project_code
-        else ""
-    )
-
-    examples = """
+_SQL_EXAMPLES = """
 Examples of correct queries:
 
 1) Employees with mismatched timesheets for November 2025:
@@ -297,18 +511,17 @@ LEFT JOIN time_off t
 GROUP BY e.employee_id, e.name, e.annual_leave_allowance;
 """
 
-    prompt = f"""
+# Static prompt prefix built once at import, with per-request text appended
+# last: provider-side prompt caches only reuse an exact static prefix, so the
+# schema/examples/rules block has to come before the user question.
+_SQL_PROMPT_PREFIX = f"""
 You are an assistant that writes SQL queries for SQLite.
 
-User question:
-{question}
-
 Database schema:
-{schema_description}
-{project_filter_hint}
+{_SCHEMA_DESCRIPTION}
 
 Here are some example patterns:
-{examples}
+{_SQL_EXAMPLES}
 
 Important rules:
 - Use ONLY the columns listed in the schema. Do NOT invent new tables or columns.
@@ -339,6 +552,27 @@ Return your answer as JSON with keys:
 - "comment": short explanation of what the query returns
 """
 
+
+# Most rows the chatbot will ever show or summarise. Generated SQL without
+# its own LIMIT gets this appended, and the fetch paths cap at the same
+# number as defense in depth.
+CHAT_ROW_LIMIT = 200
+
+
+@functools.lru_cache(maxsize=1024)
+def _generate_sql_cached(question: str, project_code: str | None) -> str:
+    project_filter_hint = (
+        f"\nThe UI has an optional project filter currently set to: {project_code}.\n"
+        "If this is relevant, you may add a condition like `AND project_code = '<code>'`.\n"
+        if project_code
+        else ""
+    )
+
+    prompt = _SQL_PROMPT_PREFIX + f"""
+User question:
+{question}
+{project_filter_hint}"""
+
     raw = call_llm(
         API_KEY,
         prompt,
@@ -357,7 +591,7 @@ Return your answer as JSON with keys:
     # ---------- 1) Try strict JSON ----------
     sql_clean: str | None = None
     try:
-        obj = json.loads(text_out)
+        obj = _json_loads(text_out)
         if isinstance(obj, dict) and isinstance(obj.get("sql"), str):
             sql_clean = obj["sql"]
     except Exception:
@@ -365,11 +599,9 @@ Return your answer as JSON with keys:
 
     # ---------- 2) Fallback: regex "sql": "..." ----------
     if not sql_clean:
-        m = re.search(r'"sql"\s*:\s*"(.+?)"', text_out, flags=re.DOTALL | re.IGNORECASE)
+        m = _SQL_JSON_DQ_RE.search(text_out)
         if not m:
-            m = re.search(
-                r"'sql'\s*:\s*'(.+?)'", text_out, flags=re.DOTALL | re.IGNORECASE
-            )
+            m = _SQL_JSON_SQ_RE.search(text_out)
         if not m:
             raise HTTPException(
                 500,
@@ -378,14 +610,10 @@ Return your answer as JSON with keys:
 
         sql_raw = m.group(1)
 
-        # 🔹 Clean typical escaping from LLM
-        # Handle literal "\n" and "\t" BEFORE we strip bare backslashes.
-        sql_raw = sql_raw.replace("\\n", " ")
-        sql_raw = sql_raw.replace("\\t", " ")
-        # Handle real newlines if any slipped through
-        sql_raw = sql_raw.replace("\\\n", " ")
-        sql_raw = sql_raw.replace("\n", " ")
-        # Unescape quotes
+        # 🔹 Clean typical escaping from LLM. Literal "\n"/"\t" sequences and
+        # escaped quotes go first, so the translate pass below (which maps
+        # bare backslashes to spaces) can't leave stray letters behind.
+        sql_raw = sql_raw.replace("\\n", " ").replace("\\t", " ")
         sql_raw = sql_raw.replace('\\"', '"')
 
         sql_clean = sql_raw
@@ -393,96 +621,17 @@ Return your answer as JSON with keys:
     # Trim and strip trailing semicolon/backticks
     sql_clean = sql_clean.strip().strip("`").strip().strip(";")
 
-    # ---------- Extra cleaning for stray backslashes ----------
-    sql_clean = sql_clean.replace("\\", " ")
-
-    # ---------- Normalise whitespace & remove "n t" artefacts ----------
-    # Collapse any weird whitespace sequences (tabs, multiple spaces, etc.)
-    sql_clean = re.sub(r"\s+", " ", sql_clean)
-
-    # If the model emitted "\n\t" and we stripped "\" we might get " n t ".
-    # Remove standalone "n t" tokens safely.
-    sql_clean = re.sub(r"\bn\s+t\b", " ", sql_clean)
-    sql_clean = re.sub(r"\s+", " ", sql_clean).strip()
+    # ---------- Character-level cleanup, whitespace, "n t" artefacts ----------
+    # One translate pass for stray backslashes/newlines/tabs, then collapse
+    # whitespace. If the model emitted "\n\t" and we stripped "\" we might
+    # get " n t "; remove standalone "n t" tokens safely.
+    sql_clean = sql_clean.translate(_CLEAN_TABLE)
+    sql_clean = _WS_RE.sub(" ", sql_clean)
+    sql_clean = _NT_RE.sub(" ", sql_clean)
+    sql_clean = _WS_RE.sub(" ", sql_clean).strip()
 
     # ---------- Post-processing / patch common LLM mistakes ----------
-
-    # 1) Fix wrong join on employees.id
-    sql_clean = re.sub(
-        r"join\s+recon_entries\s+r\s+on\s+e\.id\s*=\s*r\.employee_id",
-        "JOIN recon_entries r ON e.citi_email = r.citi_email",
-        sql_clean,
-        flags=re.IGNORECASE,
-    )
-
-    # 2) Fix references to non-existent re.status / recon_entries.status
-    sql_clean = re.sub(
-        r"\bre\.status\b", "re.reconciled_status", sql_clean, flags=re.IGNORECASE
-    )
-    sql_clean = re.sub(
-        r"\brecon_entries\.status\b",
-        "recon_entries.reconciled_status",
-        sql_clean,
-        flags=re.IGNORECASE,
-    )
-
-    # 3) Remove unnecessary strftime('%Y-%m', re.month) on TEXT column
-    sql_clean = re.sub(
-        r"strftime\(\s*'%Y-%m'\s*,\s*re\.month\s*\)",
-        "re.month",
-        sql_clean,
-        flags=re.IGNORECASE,
-    )
-    sql_clean = re.sub(
-        r"strftime\(\s*'%Y-%m'\s*,\s*recon_entries\.month\s*\)",
-        "recon_entries.month",
-        sql_clean,
-        flags=re.IGNORECASE,
-    )
-
-    # 4) Fix alias 'time_off to' -> 'time_off t_off' and its usages 'to.'
-    sql_clean = re.sub(
-        r"\btime_off\s+to\b", "time_off t_off", sql_clean, flags=re.IGNORECASE
-    )
-    sql_clean = re.sub(r"\bto\.", "t_off.", sql_clean)
-
-    # 5) Fix typo for submitted_hours_cg if LLM writes it incorrectly
-    sql_clean = re.sub(
-        r"\bre\.submitted_hours_cg\b",
-        "re.submitted_hours_cg",
-        sql_clean,
-        flags=re.IGNORECASE,
-    )
-
-    # 6) Remove invented 'projects' table joins and map p.* → recon_entries.*
-    #    First nuke the join clause.
-    sql_clean = re.sub(
-        r"\s+left\s+join\s+projects\s+p\s+on\s+.*?(?=(left join|right join|inner join|where|group by|order by|$))",
-        " ",
-        sql_clean,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
-    sql_clean = re.sub(
-        r"\s+join\s+projects\s+p\s+on\s+.*?(?=(left join|right join|inner join|where|group by|order by|$))",
-        " ",
-        sql_clean,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
-
-    #    Then replace p.project_name / p.project_code with recon_entries alias guesses.
-    sql_clean = re.sub(
-        r"\bp\.project_name\b", "rg.project_name", sql_clean, flags=re.IGNORECASE
-    )
-    sql_clean = re.sub(
-        r"\bp\.project_code\b", "rg.project_code", sql_clean, flags=re.IGNORECASE
-    )
-    # Fallback if alias is 're' not 'rg'
-    sql_clean = re.sub(
-        r"\bre\.project_name\b", "re.project_name", sql_clean, flags=re.IGNORECASE
-    )
-    sql_clean = re.sub(
-        r"\bre\.project_code\b", "re.project_code", sql_clean, flags=re.IGNORECASE
-    )
+    sql_clean = _apply_sql_fixups(sql_clean)
 
     # ---------- Safety checks ----------
 
@@ -506,26 +655,49 @@ Return your answer as JSON with keys:
             500, f"Generated SQL contains forbidden operations: {sql_clean}"
         )
 
+    # Cap the result set at the source: the summariser only ever looks at the
+    # first rows anyway, so an unbounded SELECT just burns memory building
+    # row objects nobody reads.
+    if " limit " not in lower_sql:
+        sql_clean += f" LIMIT {CHAT_ROW_LIMIT}"
+
     return sql_clean
 
 
 
+# Chatbot turns frequently repeat the same generated SELECT (same question,
+# or a follow-up over unchanged data). Cache result rows keyed on
+# (sql, data version): any write bumps the version, so entries can never
+# serve stale data. FIFO-capped like the LLM response cache.
+_chat_sql_cache: dict[tuple[str, int], list] = {}
+_CHAT_SQL_CACHE_MAX = 128
+
+
+def _chat_sql_cached(sql: str, fetch):
+    key = (sql, get_data_version())
+    if key in _chat_sql_cache:
+        return _chat_sql_cache[key]
+    rows = fetch()
+    if len(_chat_sql_cache) >= _CHAT_SQL_CACHE_MAX:
+        _chat_sql_cache.pop(next(iter(_chat_sql_cache)))
+    _chat_sql_cache[key] = rows
+    return rows
+
+
 def run_sql_and_fetch(sql: str) -> list[dict]:
     """Execute a safe SELECT against SQLite and return list of dict rows."""
-    with engine.connect() as conn:
-        result = conn.execute(text(sql))
-        rows = [dict(r) for r in result.mappings().all()]
-    return rows
 
+    def _fetch():
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text(sql))
+            return [dict(r) for r in result.mappings().fetchmany(CHAT_ROW_LIMIT)]
+
+    return _chat_sql_cached(sql, _fetch)
 
-def summarise_sql_answer(question: str, sql: str, rows: list[dict]) -> str:
-    """
-    Ask the LLM to turn SQL result rows into a natural-language answer.
-    The model is NOT allowed to invent rows that are not in the result.
-    """
-    rows_preview = json.dumps(rows[:100], default=str)  # cap preview for prompt size
 
-    prompt = f"""
+# Static instructions first, dynamic question/SQL/rows appended last, for the
+# same prompt-cache reason as _SQL_PROMPT_PREFIX.
+_SUMMARY_PROMPT_PREFIX = """
 You are a portfolio / delivery manager assistant.
 
 You are given:
@@ -540,6 +712,21 @@ you may respond with a bullet list or a compact table based only on those rows.
 If there is no data for the question, say so explicitly.
 Never invent people, numbers, or projects not present in the rows.
 
+Instructions:
+- Be concise and business-focused.
+- If listing employees, include name, emails, project_code, status, and any metrics in the rows.
+- Do not guess or extrapolate beyond the given rows.
+"""
+
+
+def summarise_sql_answer(question: str, sql: str, rows: list[dict]) -> str:
+    """
+    Ask the LLM to turn SQL result rows into a natural-language answer.
+    The model is NOT allowed to invent rows that are not in the result.
+    """
+    rows_preview = _json_dumps_str(rows[:100])  # cap preview for prompt size
+
+    prompt = _SUMMARY_PROMPT_PREFIX + f"""
 User question:
 {question}
 
@@ -548,11 +735,6 @@ Executed SQL:
 
 Result rows (JSON):
 {rows_preview}
-
-Instructions:
-- Be concise and business-focused.
-- If listing employees, include name, emails, project_code, status, and any metrics in the rows.
-- Do not guess or extrapolate beyond the given rows.
 """
 
     raw = call_llm(
@@ -585,6 +767,7 @@ def sanitize(obj):
     return obj
 
 
+@functools.lru_cache(maxsize=256)
 def month_to_range(ym: str):
     year, month = map(int, ym.split("-"))
     last = calendar.monthrange(year, month)[1]
@@ -593,34 +776,63 @@ def month_to_range(ym: str):
     return start, end
 
 
-def choose_col(row, *names, default=""):
+def coalesce_str(df, *names, default=""):
+    """
+    Vectorized choose_col: first non-null value across the candidate columns,
+    as str, for every row at once.
+    """
+    out = pd.Series(default, index=df.index, dtype=object)
+    remaining = pd.Series(True, index=df.index)
     for n in names:
-        if n in row and not pd.isna(row[n]):
-            return row[n]
-    return default
-
-
-def choose_project_code(row):
-    candidates = [
-        "Project Code_cg",
-        "Project Code_citi",
-        "Project Code",
-        "ProjectCode_cg",
-        "ProjectCode_citi",
-        "ProjectCode",
-        "Proj Code_cg",
-        "Proj Code_citi",
-        "Proj Code",
-        "Project_cg",
-        "Project_citi",
-        "Project",
+        if n in df.columns:
+            vals = df[n]
+            use = remaining & vals.notna()
+            out.loc[use] = vals.loc[use].astype(str)
+            remaining &= ~use
+    return out.to_numpy()
+
+
+def coalesce_num(df, *names):
+    """First non-null numeric value across the candidate columns, NaN -> 0."""
+    cols = [
+        pd.to_numeric(df[n], errors="coerce") for n in names if n in df.columns
     ]
+    if not cols:
+        return np.zeros(len(df))
+    if len(cols) == 1:
+        return cols[0].fillna(0.0).to_numpy(dtype=float)
+    return (
+        pd.concat(cols, axis=1).bfill(axis=1).iloc[:, 0].fillna(0.0).to_numpy(dtype=float)
+    )
+
+
+PROJECT_CODE_CANDIDATES = [
+    "Project Code_cg",
+    "Project Code_citi",
+    "Project Code",
+    "ProjectCode_cg",
+    "ProjectCode_citi",
+    "ProjectCode",
+    "Proj Code_cg",
+    "Proj Code_citi",
+    "Proj Code",
+    "Project_cg",
+    "Project_citi",
+    "Project",
+]
+
+
+def coalesce_project_code(df, candidates=PROJECT_CODE_CANDIDATES, default="UNKNOWN"):
+    """Vectorized choose_project_code: skip null/blank values per candidate."""
+    out = pd.Series(default, index=df.index, dtype=object)
+    remaining = pd.Series(True, index=df.index)
     for key in candidates:
-        if key in row and not pd.isna(row[key]):
-            val = str(row[key]).strip()
-            if val:
-                return val
-    return "UNKNOWN"
+        if key in df.columns:
+            vals = df[key].where(df[key].notna(), "").astype(str).str.strip()
+            use = remaining & (vals != "")
+            out.loc[use] = vals.loc[use]
+            remaining &= ~use
+    return out.to_numpy()
 
 
 def upsert_employee_from_row(
@@ -637,12 +849,15 @@ def upsert_employee_from_row(
     mon: int,
 ):
     """Create/update Employee master record from monthly CG/CITI row."""
+    # Stored emails are normalized by the Employee validator; normalize the
+    # lookup key the same way or a mixed-case sheet misses the stored row.
+    citi_email = (citi_email or "").strip().lower()
     if not citi_email:
         return
 
     emp = (
         db.execute(
-            select(Employee).where(Employee.citi_email == citi_email)
+            Q_EMPLOYEE_BY_CITI_EMAIL, {"email": citi_email}
         ).scalar_one_or_none()
     )
 
@@ -660,6 +875,11 @@ def upsert_employee_from_row(
             start_date=datetime.date(year, mon, 1),
         )
         db.add(emp)
+        # Flush so the insert is visible to the next lookup in this
+        # transaction: ingest replays the first and last row per email, and
+        # leaving both staged would double-insert against the unique email
+        # index on commit.
+        db.flush()
     else:
         if eid:
             emp.employee_id = eid
@@ -678,11 +898,61 @@ def upsert_employee_from_row(
 
 # ----------------- Workbook ingestion -----------------
 
+# Monotonic version of the ingested data; bumped on every write that changes
+# timesheet rows. Cache entries anywhere in the app key on this so they
+# invalidate the moment new data lands.
+_data_version = 0
+
+# One-entry cache of the last ingested workbook, keyed by content hash:
+# demo flows re-POST the same sample workbook repeatedly, and re-ingesting
+# identical bytes into an unchanged DB is pure waste.
+_ingest_cache: dict[str, tuple[int, dict]] = {}
+
+
+def get_data_version() -> int:
+    return _data_version
+
+
+def bump_data_version() -> int:
+    global _data_version
+    _data_version += 1
+    return _data_version
+
+
+def _workbook_digest(source) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(source, (bytes, bytearray)):
+        h.update(source)
+    else:
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def ingest_workbook(source, db: Session):
+    """
+    Ingest a workbook from raw bytes or a filesystem path. Prefer passing a
+    path for uploads — the file never has to be held in memory as one blob.
+    """
+    # Same bytes, unchanged DB -> nothing to do
+    digest = _workbook_digest(source)
+    cached = _ingest_cache.get(digest)
+    if cached and cached[0] == _data_version:
+        return cached[1]
 
-def ingest_workbook(content: bytes, db: Session):
     # Read Excel
     try:
-        xls = pd.ExcelFile(io.BytesIO(content))
+        if isinstance(source, (bytes, bytearray)):
+            xls = pd.ExcelFile(
+                io.BytesIO(source),
+                engine=EXCEL_ENGINE,
+                engine_kwargs=EXCEL_ENGINE_KWARGS,
+            )
+        else:
+            xls = pd.ExcelFile(
+                source, engine=EXCEL_ENGINE, engine_kwargs=EXCEL_ENGINE_KWARGS
+            )
     except Exception as e:
         raise HTTPException(400, f"Invalid Excel: {e}")
 
@@ -694,261 +964,338 @@ def ingest_workbook(content: bytes, db: Session):
             )
 
     # --------- Monthly sheets (CG / CITI) ---------
-    df_cg = pd.read_excel(xls, sheet_name="CG")
-    df_citi = pd.read_excel(xls, sheet_name="CITI")
+    monthly_cols = lambda c: str(c).strip() in MONTHLY_SHEET_COLS  # noqa: E731
+    df_cg = pd.read_excel(
+        xls, sheet_name="CG", usecols=monthly_cols, dtype=MONTHLY_SHEET_DTYPES
+    )
+    df_citi = pd.read_excel(
+        xls, sheet_name="CITI", usecols=monthly_cols, dtype=MONTHLY_SHEET_DTYPES
+    )
     df_cg.columns = [c.strip() for c in df_cg.columns]
     df_citi.columns = [c.strip() for c in df_citi.columns]
 
     if "Citi Email" not in df_cg.columns or "Citi Email" not in df_citi.columns:
         raise HTTPException(400, "Both CG and CITI sheets must include 'Citi Email'")
 
+    # Canonicalise the join key up front, matching the write-time
+    # normalization on Employee/TimeOff: the dedup, the CG/CITI merge, the
+    # employee upserts and the recon rows below all key on this column.
+    for df in (df_cg, df_citi):
+        df["Citi Email"] = df["Citi Email"].str.strip().str.lower()
+
     if "Month" not in df_cg.columns:
         df_cg["Month"] = None
     if "Month" not in df_citi.columns:
         df_citi["Month"] = None
 
+    # De-duplicate (Citi Email, Month) on each side before merging so the
+    # outer join can never fan out to a cartesian product on repeated keys;
+    # validate= makes any remaining duplication a hard error instead of a
+    # silent row explosion.
+    df_cg = df_cg.drop_duplicates(subset=["Citi Email", "Month"], keep="last")
+    df_citi = df_citi.drop_duplicates(subset=["Citi Email", "Month"], keep="last")
+
     merged = pd.merge(
         df_cg,
         df_citi,
         on=["Citi Email", "Month"],
         how="outer",
         suffixes=("_cg", "_citi"),
+        sort=False,
+        validate="one_to_one",
     )
 
-    # Ensure uniqueness: one row per (Citi Email, Month)
+    # Deterministic order: downstream employee upserts replay rows per email
     merged = merged.sort_values(by=["Citi Email", "Month"])
-    merged = merged.drop_duplicates(subset=["Citi Email", "Month"], keep="last")
 
-    # Clear existing ReconEntry for months in this workbook
+    # Clear existing ReconEntry for months in this workbook (one statement)
     months_in_file = set(str(m) for m in merged["Month"].dropna().astype(str).tolist())
-    for ym in months_in_file:
-        db.execute(delete(ReconEntry).where(ReconEntry.month == ym))
-
-    # Upsert ReconEntry
-    for _, row in merged.iterrows():
-        month_str = str(row.get("Month") or "")
-        if not month_str or month_str == "nan":
-            continue
-        try:
-            year, mon = map(int, month_str.split("-"))
-        except Exception:
-            continue
-
-        eid = str(choose_col(row, "ID_cg", "ID_citi", "ID") or "")
-        name = str(choose_col(row, "Name_cg", "Name_citi", "Name") or "")
-        cg_email = str(choose_col(row, "CG Email_cg", "CG Email") or "")
-        citi_email = str(
-            choose_col(row, "Citi Email", "Citi Email_cg", "Citi Email_citi") or ""
+    if months_in_file:
+        db.execute(delete(ReconEntry).where(ReconEntry.month.in_(months_in_file)))
+
+    # Upsert ReconEntry — vectorized over the merged frame instead of
+    # iterrows(): coalesce the suffixed columns once per column, compute the
+    # numeric reconciliation with NumPy, then bulk-insert the records.
+
+    # Keep only rows with a parseable 'YYYY-MM' month
+    month_col = merged["Month"].astype(str).str.strip()
+    ym_parts = month_col.str.extract(r"^(\d{4})-(\d{1,2})$")
+    merged = merged[ym_parts[0].notna()].copy()
+    recon_rows: list[dict] = []
+    if not merged.empty:
+        month_strs = merged["Month"].astype(str).str.strip()
+        years = ym_parts.loc[merged.index, 0].astype(int).to_numpy()
+        mons = ym_parts.loc[merged.index, 1].astype(int).to_numpy()
+
+        eids = coalesce_str(merged, "ID_cg", "ID_citi", "ID")
+        names = coalesce_str(merged, "Name_cg", "Name_citi", "Name")
+        cg_emails = coalesce_str(merged, "CG Email_cg", "CG Email")
+        citi_emails = coalesce_str(
+            merged, "Citi Email", "Citi Email_cg", "Citi Email_citi"
         )
-        region_code = str(
-            choose_col(row, "Region Code_cg", "Region Code_citi", "Region Code") or ""
+        region_codes = coalesce_str(
+            merged, "Region Code_cg", "Region Code_citi", "Region Code"
         )
-        region_name = str(
-            choose_col(row, "Region Name_cg", "Region Name_citi", "Region Name") or ""
+        region_names = coalesce_str(
+            merged, "Region Name_cg", "Region Name_citi", "Region Name"
         )
-        project_name = str(
-            choose_col(row, "Project Name_cg", "Project Name_citi", "Project Name")
-            or ""
+        project_names = coalesce_str(
+            merged, "Project Name_cg", "Project Name_citi", "Project Name"
         )
-        project_code = choose_project_code(row)
-        billing_rate = float(
-            choose_col(row, "Billing Rate_cg", "Billing Rate_citi", "Billing Rate")
-            or 0
+        project_codes = coalesce_project_code(merged)
+        billing_rates = coalesce_num(
+            merged, "Billing Rate_cg", "Billing Rate_citi", "Billing Rate"
         )
 
-        total_cg = float(row.get("Total Hours(CG)") or 0)
-        submitted_cg = float(row.get("Submitted Hours(CG)") or 0)
-        submitted_on_cg = row.get("Submitted On")
-        if pd.isna(submitted_on_cg):
-            submitted_on_cg = None
+        total_cg = coalesce_num(merged, "Total Hours(CG)")
+        submitted_cg = coalesce_num(merged, "Submitted Hours(CG)")
+        total_citi = coalesce_num(merged, "Total Hours(Citi)")
+        submitted_citi = coalesce_num(merged, "Submitted Hours(Citi)")
 
-        total_citi = float(row.get("Total Hours(Citi)") or 0)
-        submitted_citi = float(row.get("Submitted Hours(Citi)") or 0)
-        holidays_csv = str(row.get("Holidays") or "")
+        if "Submitted On" in merged.columns:
+            submitted_on = [
+                None if pd.isna(v) else str(v) for v in merged["Submitted On"]
+            ]
+        else:
+            submitted_on = [None] * len(merged)
 
-        # ---- Expected hours logic with holidays + approved time off ----
-        base_expected = expected_hours_for_month(year, mon, holidays_csv or None)
+        if "Holidays" in merged.columns:
+            holidays_col = [str(v or "") for v in merged["Holidays"]]
+        else:
+            holidays_col = [""] * len(merged)
 
-        # Approved time off for this email in this month (in hours)
-        timeoff_hours = approved_timeoff_hours_for_month(db, citi_email, year, mon)
+        # ---- Expected hours logic with holidays + approved time off ----
+        # Preload all approved time off in one query and pro-rate overlaps in
+        # memory — the old per-(email, month) lookups issued one SELECT per
+        # employee-month in the workbook.
+        timeoff_by_email: dict[str, list[tuple]] = {}
+        for t_email, t_start, t_end in db.execute(
+            select(TimeOff.citi_email, TimeOff.start_date, TimeOff.end_date).where(
+                TimeOff.status == "Approved"
+            )
+        ):
+            timeoff_by_email.setdefault(t_email, []).append((t_start, t_end))
+
+        def timeoff_hours_for(email: str, year: int, mon: int) -> float:
+            total = 0.0
+            for t_start, t_end in timeoff_by_email.get(email, ()):
+                total += (
+                    working_days_overlap_in_month(t_start, t_end, year, mon)
+                    * HOURS_PER_DAY
+                )
+            return total
+
+        # Memoize per unique (year, month, holidays) / (email, year, month)
+        # so a workbook with N rows does M << N computations.
+        exp_cache: dict[tuple, float] = {}
+        timeoff_cache: dict[tuple, float] = {}
+        base_expected = np.empty(len(merged))
+        timeoff_hours = np.empty(len(merged))
+        for i, (year, mon, hols, email) in enumerate(
+            zip(years, mons, holidays_col, citi_emails)
+        ):
+            exp_key = (year, mon, hols)
+            if exp_key not in exp_cache:
+                exp_cache[exp_key] = expected_hours_for_month(year, mon, hols or None)
+            base_expected[i] = exp_cache[exp_key]
+
+            to_key = (email, year, mon)
+            if to_key not in timeoff_cache:
+                timeoff_cache[to_key] = timeoff_hours_for(email, year, mon)
+            timeoff_hours[i] = timeoff_cache[to_key]
 
         # Effective expected after subtracting approved time off
-        effective_expected = max(base_expected - timeoff_hours, 0.0)
-
-        # For status comparison, use effective expected (not raw 160)
-        submitted_cg = float(submitted_cg or 0.0)
-        submitted_citi = float(submitted_citi or 0.0)
+        effective_expected = np.maximum(base_expected - timeoff_hours, 0.0)
 
         # Status per system vs effective expected
-        status_cg = status_from(effective_expected, submitted_cg)
-        status_citi = status_from(effective_expected, submitted_citi)
+        status_cg = np.select(
+            [submitted_cg <= 0, submitted_cg < effective_expected],
+            ["Not Completed", "Partial"],
+            default="Completed",
+        )
+        status_citi = np.select(
+            [submitted_citi <= 0, submitted_citi < effective_expected],
+            ["Not Completed", "Partial"],
+            default="Completed",
+        )
 
         # Reconciled hours: what we can honestly bill, capped by effective expected
-        reconciled_hours = min(submitted_cg, submitted_citi, effective_expected)
-        diff = abs(submitted_cg - submitted_citi)
+        reconciled_hours = np.minimum(
+            np.minimum(submitted_cg, submitted_citi), effective_expected
+        )
+        diff = np.abs(submitted_cg - submitted_citi)
         tol = 0.01
-
-        if submitted_cg <= tol and submitted_citi <= tol:
-            reconciled_status = "Not Completed"
-        elif diff > tol:
-            reconciled_status = "Mismatch"
-        elif status_cg == "Completed" and status_citi == "Completed":
-            reconciled_status = "Completed"
-        else:
-            reconciled_status = "Partial"
-
-        # Maintain employee master from this row
-        upsert_employee_from_row(
-            db=db,
-            eid=eid,
-            name=name,
-            cg_email=cg_email,
-            citi_email=citi_email,
-            region_code=region_code,
-            region_name=region_name,
-            project_code=project_code,
-            billing_rate=billing_rate,
-            year=year,
-            mon=mon,
+        reconciled_status = np.select(
+            [
+                (submitted_cg <= tol) & (submitted_citi <= tol),
+                diff > tol,
+                (status_cg == "Completed") & (status_citi == "Completed"),
+            ],
+            ["Not Completed", "Mismatch", "Completed"],
+            default="Partial",
         )
 
-        db.add(
-            ReconEntry(
-                employee_id=eid,
-                month=month_str,
-                name=name,
-                cg_email=cg_email,
-                citi_email=citi_email,
-                region_code=region_code,
-                region_name=region_name,
-                project_name=project_name,
-                project_code=project_code,
-                billing_rate=billing_rate,
-                total_hours_cg=total_cg,
-                submitted_hours_cg=submitted_cg,
-                submitted_on_cg=str(submitted_on_cg) if submitted_on_cg else None,
-                status_cg=status_cg,
-                total_hours_citi=total_citi,
-                submitted_hours_citi=submitted_citi,
-                holidays=holidays_csv or None,
-                status_citi=status_citi,
+        # Maintain employee master. merged is sorted by (Citi Email, Month),
+        # so replaying the first row (creation, earliest start date) and the
+        # last row (final field values) per email matches what the old
+        # per-row loop converged to, with O(employees) work instead of O(rows).
+        first_pos: dict[str, int] = {}
+        last_pos: dict[str, int] = {}
+        for i, email in enumerate(citi_emails):
+            first_pos.setdefault(email, i)
+            last_pos[email] = i
+        for email, fpos in first_pos.items():
+            positions = [fpos]
+            if last_pos[email] != fpos:
+                positions.append(last_pos[email])
+            for i in positions:
+                upsert_employee_from_row(
+                    db=db,
+                    eid=eids[i],
+                    name=names[i],
+                    cg_email=cg_emails[i],
+                    citi_email=email,
+                    region_code=region_codes[i],
+                    region_name=region_names[i],
+                    project_code=project_codes[i],
+                    billing_rate=billing_rates[i],
+                    year=int(years[i]),
+                    mon=int(mons[i]),
+                )
+
+        recon_rows = [
+            {
+                "employee_id": eids[i],
+                "month": month_strs.iat[i],
+                "name": names[i],
+                "cg_email": cg_emails[i],
+                "citi_email": citi_emails[i],
+                "region_code": region_codes[i],
+                "region_name": region_names[i],
+                "project_name": project_names[i],
+                "project_code": project_codes[i],
+                "billing_rate": billing_rates[i],
+                "total_hours_cg": total_cg[i],
+                "submitted_hours_cg": submitted_cg[i],
+                "submitted_on_cg": submitted_on[i],
+                "status_cg": status_cg[i],
+                "total_hours_citi": total_citi[i],
+                "submitted_hours_citi": submitted_citi[i],
+                "holidays": holidays_col[i] or None,
+                "status_citi": status_citi[i],
                 # Store EFFECTIVE expected (after time off)
-                expected_hours=effective_expected,
-                reconciled_hours=reconciled_hours,
-                reconciled_status=reconciled_status,
-                reminders=0,
-            )
-        )
+                "expected_hours": effective_expected[i],
+                "reconciled_hours": reconciled_hours[i],
+                "reconciled_status": reconciled_status[i],
+                "reminders": 0,
+            }
+            for i in range(len(merged))
+        ]
 
+    if recon_rows:
+        bulk_insert(db, ReconEntry, recon_rows)
     db.commit()
 
     # --------- Daily sheets (CG_DAILY / CITI_DAILY) ---------
-    df_cg_d = pd.read_excel(xls, sheet_name="CG_DAILY")
-    df_ci_d = pd.read_excel(xls, sheet_name="CITI_DAILY")
+    daily_cols = lambda c: str(c).strip() in DAILY_SHEET_COLS  # noqa: E731
+    df_cg_d = pd.read_excel(xls, sheet_name="CG_DAILY", usecols=daily_cols)
+    df_ci_d = pd.read_excel(xls, sheet_name="CITI_DAILY", usecols=daily_cols)
     df_cg_d.columns = [c.strip() for c in df_cg_d.columns]
     df_ci_d.columns = [c.strip() for c in df_ci_d.columns]
 
-    def ym_of(val):
-        try:
-            d = pd.to_datetime(val).date()
-            return f"{d.year:04d}-{d.month:02d}"
-        except Exception:
-            return None
-
-    months_daily = set(
-        filter(
-            None,
-            df_cg_d["Date"].map(ym_of).tolist()
-            + df_ci_d["Date"].map(ym_of).tolist(),
-        )
-    )
+    # One vectorized datetime pass per sheet instead of per-cell pd.to_datetime;
+    # unparseable dates become NaT and the row is dropped (same best-effort
+    # behaviour the old per-row try/except had).
+    df_cg_d["Date"] = pd.to_datetime(df_cg_d["Date"], errors="coerce")
+    df_ci_d["Date"] = pd.to_datetime(df_ci_d["Date"], errors="coerce")
+    df_cg_d = df_cg_d.dropna(subset=["Date"])
+    df_ci_d = df_ci_d.dropna(subset=["Date"])
 
-    # Clear existing daily rows for months covered in this workbook
-    for ym in months_daily:
-        start, end = month_to_range(ym)
-        db.execute(
-            delete(CGDaily).where(CGDaily.date >= start, CGDaily.date <= end)
-        )
-        db.execute(
-            delete(CITIDaily).where(CITIDaily.date >= start, CITIDaily.date <= end)
-        )
+    months_daily = set(df_cg_d["Date"].dt.strftime("%Y-%m")) | set(
+        df_ci_d["Date"].dt.strftime("%Y-%m")
+    )
 
-    def extract_pcode(row, db_session: Session, citi_email: str, date_obj: datetime.date):
-        """
-        Prefer project code from sheet; if missing, fall back to monthly ReconEntry
-        for this (citi_email, month). This avoids 'UNKNOWN' when we actually know it.
-        """
-        # 1) direct from sheet
-        for key in ["Project Code", "ProjectCode", "Proj Code", "Project"]:
-            if key in row and not pd.isna(row[key]):
-                val = str(row[key]).strip()
-                if val:
-                    return val
-
-        # 2) fallback: lookup in ReconEntry for this email + month
-        ym = f"{date_obj.year:04d}-{date_obj.month:02d}"
-        rec = db_session.execute(
-            select(ReconEntry.project_code).where(
-                ReconEntry.citi_email == citi_email,
-                ReconEntry.month == ym,
+    # Clear existing daily rows for months covered in this workbook:
+    # one DELETE per table over all month ranges instead of two per month.
+    if months_daily:
+        ranges = [month_to_range(ym) for ym in sorted(months_daily)]
+        cg_cond = or_(*[CGDaily.date.between(s, e) for s, e in ranges])
+        ci_cond = or_(*[CITIDaily.date.between(s, e) for s, e in ranges])
+        db.execute(delete(CGDaily).where(cg_cond))
+        db.execute(delete(CITIDaily).where(ci_cond))
+
+    # Fallback project codes from the monthly ReconEntry rows (including the
+    # ones staged above), fetched in one query instead of a SELECT per unique
+    # (email, month) with a blank daily cell. This avoids 'UNKNOWN' when we
+    # actually know the code.
+    pcode_map: dict[tuple[str, str], str] = {}
+    if months_daily:
+        for p_email, p_month, p_code in db.execute(
+            select(
+                ReconEntry.citi_email, ReconEntry.month, ReconEntry.project_code
+            ).where(ReconEntry.month.in_(months_daily))
+        ):
+            pcode_map[(p_email, p_month)] = p_code
+
+    def recon_pcode(citi_email: str, ym: str) -> str:
+        return pcode_map.get((citi_email, ym)) or "UNKNOWN"
+
+    def build_daily_rows(df_d: pd.DataFrame) -> list[dict]:
+        """Column-wise extraction instead of iterrows + per-cell conversions."""
+        if df_d.empty:
+            return []
+        emails = df_d["Citi Email"].astype(str).str.strip().str.lower().to_numpy()
+        dates = df_d["Date"].dt.date.to_numpy()
+        yms = df_d["Date"].dt.strftime("%Y-%m").to_numpy()
+        if "Hours" in df_d.columns:
+            hours = (
+                pd.to_numeric(df_d["Hours"], errors="coerce")
+                .fillna(0.0)
+                .to_numpy(dtype=float)
             )
-        ).scalar_one_or_none()
-        if rec:
-            return rec
-
-        # 3) still unknown
-        return "UNKNOWN"
-
-    # Insert CG daily
-    for _, r in df_cg_d.iterrows():
-        try:
-            c_email = str(r["Citi Email"])
-            date_val = pd.to_datetime(r["Date"]).date()
-            pcode = extract_pcode(r, db, c_email, date_val)
-            db.add(
-                CGDaily(
-                    citi_email=c_email,
-                    date=date_val,
-                    hours=float(r.get("Hours", 0) or 0),
-                    project_code=pcode,
-                )
+        else:
+            hours = np.zeros(len(df_d))
+        # Sheet-provided codes first; blank means fall back to ReconEntry.
+        pcodes = coalesce_project_code(
+            df_d,
+            candidates=("Project Code", "ProjectCode", "Proj Code", "Project"),
+            default="",
+        )
+        return [
+            {
+                "citi_email": email,
+                "date": date_val,
+                "hours": hrs,
+                "project_code": pcode or recon_pcode(email, ym),
+            }
+            for email, date_val, ym, hrs, pcode in zip(
+                emails, dates, yms, hours, pcodes
             )
-        except Exception:
-            # best-effort; skip malformed rows
-            pass
+        ]
 
-    # Insert CITI daily
-    for _, r in df_ci_d.iterrows():
-        try:
-            c_email = str(r["Citi Email"])
-            date_val = pd.to_datetime(r["Date"]).date()
-            pcode = extract_pcode(r, db, c_email, date_val)
-            db.add(
-                CITIDaily(
-                    citi_email=c_email,
-                    date=date_val,
-                    hours=float(r.get("Hours", 0) or 0),
-                    project_code=pcode,
-                )
-            )
-        except Exception:
-            pass
+    # Batch rows and upsert in chunks rather than one ORM add() per cell.
+    cg_daily_rows = build_daily_rows(df_cg_d)
+    citi_daily_rows = build_daily_rows(df_ci_d)
 
+    if cg_daily_rows:
+        upsert_daily(db, CGDaily, cg_daily_rows)
+    if citi_daily_rows:
+        upsert_daily(db, CITIDaily, citi_daily_rows)
     db.commit()
 
+    # Let callers reuse what we already parsed instead of re-reading the file
+    result = {"months": sorted(months_in_file)}
+    version = bump_data_version()
+    _ingest_cache.clear()
+    _ingest_cache[digest] = (version, result)
+    return result
+
 
 def working_days_between(start: datetime.date, end: datetime.date) -> int:
     """Count working days (Mon–Fri) between start and end inclusive."""
     if end < start:
         start, end = end, start
-    days = 0
-    cur = start
-    one = datetime.timedelta(days=1)
-    while cur <= end:
-        if not is_weekend(cur):
-            days += 1
-        cur += one
-    return days
+    return int(np.busday_count(start, end + datetime.timedelta(days=1)))
 
 HOURS_PER_DAY = 8  # adjust if your org uses a different standard
 
@@ -973,14 +1320,7 @@ def working_days_overlap_in_month(
     if end_clamped < start_clamped:
         return 0
 
-    days = 0
-    cur = start_clamped
-    one = datetime.timedelta(days=1)
-    while cur <= end_clamped:
-        if not is_weekend(cur):
-            days += 1
-        cur += one
-    return days
+    return working_days_between(start_clamped, end_clamped)
 
 
 def approved_timeoff_hours_for_month(
@@ -1033,21 +1373,45 @@ def require_login(request: Request):
 # ----------------- HTML pages -----------------
 
 
+@functools.lru_cache(maxsize=None)
+def _page_bodies(name: str) -> tuple[bytes, bytes]:
+    """Raw and gzipped bytes for a static page, read from disk once."""
+    raw = (APP_DIR / "static" / name).read_bytes()
+    return raw, gzip.compress(raw, compresslevel=6)
+
+
+def _static_page(name: str, request: Request | None = None) -> Response:
+    """
+    Serve a static HTML page from the in-process cache: the pages never
+    change at runtime, so there is no reason to touch the filesystem per
+    request, and clients that accept gzip get a body compressed once at
+    first hit rather than per response.
+    """
+    raw, gzipped = _page_bodies(name)
+    if request is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            gzipped,
+            media_type="text/html",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return Response(raw, media_type="text/html")
+
+
 @app.get("/", response_class=HTMLResponse)
-def timesheets_page():
-    return (APP_DIR / "static" / "index.html").read_text(encoding="utf-8")
+def timesheets_page(request: Request):
+    return _static_page("index.html", request)
 
 
 @app.get("/billing", response_class=HTMLResponse)
 def billing_page(request: Request):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
-    return (APP_DIR / "static" / "billing.html").read_text(encoding="utf-8")
+    return _static_page("billing.html", request)
 
 
 @app.get("/login", response_class=HTMLResponse)
-def login_page():
-    return (APP_DIR / "static" / "login.html").read_text(encoding="utf-8")
+def login_page(request: Request):
+    return _static_page("login.html", request)
 
 
 @app.post("/login")
@@ -1067,22 +1431,36 @@ def logout(request: Request):
 
 
 @app.get("/admin", response_class=HTMLResponse)
-def admin_page():
-    return (APP_DIR / "static" / "admin.html").read_text(encoding="utf-8")
+def admin_page(request: Request):
+    return _static_page("admin.html", request)
 
 
 @app.get("/chatbot", response_class=HTMLResponse)
-def chatbot_page():
-    return (APP_DIR / "static" / "chatbot.html").read_text(encoding="utf-8")
+def chatbot_page(request: Request):
+    return _static_page("chatbot.html", request)
 
 @app.get("/employees", response_class=HTMLResponse)
-def employees_page():
-    return (APP_DIR / "static" / "employees.html").read_text(encoding="utf-8")
+def employees_page(request: Request):
+    return _static_page("employees.html", request)
 
 
 @app.get("/timeoff", response_class=HTMLResponse)
-def timeoff_page():
-    return (APP_DIR / "static" / "timeoff.html").read_text(encoding="utf-8")
+def timeoff_page(request: Request):
+    return _static_page("timeoff.html", request)
+
+_UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+async def _spool_upload_to_tmp(file: UploadFile) -> Path:
+    """Stream an UploadFile to a temp file in chunks; returns the temp path."""
+    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+    try:
+        while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+            tmp.write(chunk)
+    finally:
+        tmp.close()
+    return Path(tmp.name)
+
 
 # ----------------- Admin grid upload -----------------
 
@@ -1097,11 +1475,24 @@ async def upload_monthly_grid(
     if system not in ("CG", "CITI"):
         raise HTTPException(400, "system must be 'CG' or 'CITI'")
 
-    content = await file.read()
+    tmp_path = await _spool_upload_to_tmp(file)
     try:
-        df = pd.read_excel(io.BytesIO(content))
-    except Exception as e:
-        raise HTTPException(400, f"Invalid Excel: {e}")
+        try:
+            # Keep only the key columns and day-number columns; grids often
+            # carry trailing notes/total columns nobody reads. Day headers may
+            # parse as ints or strings depending on the sheet, so dtype is
+            # left to the bulk to_numeric pass below.
+            df = pd.read_excel(
+                tmp_path,
+                engine=EXCEL_ENGINE,
+                engine_kwargs=EXCEL_ENGINE_KWARGS,
+                usecols=lambda c: str(c).strip() in ("Citi Email", "Project Code")
+                or str(c).strip().isdigit(),
+            )
+        except Exception as e:
+            raise HTTPException(400, f"Invalid Excel: {e}")
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     df.columns = [str(c).strip() for c in df.columns]
     if "Citi Email" not in df.columns or "Project Code" not in df.columns:
@@ -1112,7 +1503,10 @@ async def upload_monthly_grid(
     except Exception:
         raise HTTPException(400, "Month must be YYYY-MM")
 
-    day_cols = [c for c in df.columns if str(c).isdigit() and 1 <= int(c) <= 31]
+    # Columns were stringified and stripped above, so one isdigit check and
+    # one int() per header is enough.
+    day_ints = {c: int(c) for c in df.columns if c.isdigit()}
+    day_cols = [c for c, d in day_ints.items() if 1 <= d <= 31]
     if not day_cols:
         raise HTTPException(400, "No day columns (1..31) found")
 
@@ -1128,23 +1522,37 @@ async def upload_monthly_grid(
     y, m = start.year, start.month
     _, last = calendar.monthrange(y, m)
 
-    for _, row in df.iterrows():
-        email = str(row["Citi Email"])
-        pcode = str(row["Project Code"] or "UNKNOWN")
-        for dcol in day_cols:
-            d = int(dcol)
-            if d > last:
-                continue
-            hrs = float(row.get(dcol) or 0)
-            if hrs <= 0:
-                continue
-            dte = datetime.date(y, m, d)
-            if system == "CG":
-                db.add(CGDaily(citi_email=email, date=dte, hours=hrs, project_code=pcode))
-            else:
-                db.add(CITIDaily(citi_email=email, date=dte, hours=hrs, project_code=pcode))
+    # Melt the day columns into long form and filter in bulk — no Python
+    # loop over N employees × 31 day cells.
+    long = df.melt(
+        id_vars=["Citi Email", "Project Code"],
+        value_vars=day_cols,
+        var_name="day",
+        value_name="hours",
+    )
+    long["hours"] = pd.to_numeric(long["hours"], errors="coerce").fillna(0.0)
+    long["day"] = long["day"].map(day_ints)
+    long = long[(long["hours"] > 0) & (long["day"] <= last)]
+
+    # Same canonical email form as the workbook ingest, so normalized
+    # callers (/api/daily) see these rows and the upsert key can't
+    # case-split against previously ingested days.
+    grid_rows = [
+        {
+            "citi_email": str(email).strip().lower(),
+            "date": datetime.date(y, m, day),
+            "hours": float(hours),
+            "project_code": str(pcode or "UNKNOWN"),
+        }
+        for email, pcode, day, hours in zip(
+            long["Citi Email"], long["Project Code"], long["day"], long["hours"]
+        )
+    ]
 
+    if grid_rows:
+        upsert_daily(db, CGDaily if system == "CG" else CITIDaily, grid_rows)
     db.commit()
+    bump_data_version()
     return {"ok": True}
 
 
@@ -1153,8 +1561,13 @@ async def upload_monthly_grid(
 
 @app.post("/api/upload")
 async def upload(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    content = await file.read()
-    ingest_workbook(content, db)
+    # Spool the upload to disk in chunks instead of buffering the whole
+    # workbook in RAM; pandas then reads from the path.
+    tmp_path = await _spool_upload_to_tmp(file)
+    try:
+        ingest_workbook(tmp_path, db)
+    finally:
+        tmp_path.unlink(missing_ok=True)
     return {"ok": True}
 
 
@@ -1163,11 +1576,10 @@ def use_sample(db: Session = Depends(get_db)):
     sample = DATA_DIR / "sample_workbook.xlsx"
     ensure_sample_workbook(sample)
 
-    content = sample.read_bytes()
-    ingest_workbook(content, db)
+    result = ingest_workbook(sample, db)
 
-    df = pd.read_excel(io.BytesIO(content), sheet_name="CG")
-    months = sorted(set(str(m) for m in df["Month"].dropna().astype(str).tolist()))
+    # Reuse the months ingest_workbook already parsed — no second xlsx parse
+    months = result["months"]
     latest = max(months) if months else None
     latest_year, latest_month = None, None
     if latest:
@@ -1196,59 +1608,91 @@ def projects(year: int, month: int, db: Session = Depends(get_db)):
 @app.get("/api/report")
 def report(year: int, month: int, db: Session = Depends(get_db)):
     ym = f"{year:04d}-{month:02d}"
-    rows = db.execute(select(ReconEntry).where(ReconEntry.month == ym)).scalars().all()
-
-    total = len(rows)
-    completed = sum(1 for r in rows if r.reconciled_status == "Completed")
-    partial = sum(1 for r in rows if r.reconciled_status == "Partial")
-    mismatch = sum(1 for r in rows if r.reconciled_status == "Mismatch")
-    not_completed = sum(1 for r in rows if r.reconciled_status == "Not Completed")
-
-    records = [
-        {
-            "employee_id": r.employee_id,
-            "name": r.name,
-            "email": r.cg_email or r.citi_email,
-            "citi_email": r.citi_email,
-            "project_code": r.project_code,
-            "total_hours": max(
-                r.total_hours_cg or 0, r.total_hours_citi or 0, r.expected_hours or 0
-            ),
-            "submitted_hours_cg": r.submitted_hours_cg,
-            "submitted_hours_citi": r.submitted_hours_citi,
-            "submitted_on": r.submitted_on_cg,
-            "status_cg": r.status_cg,
-            "status_citi": r.status_citi,
-            "reconciled_status": r.reconciled_status,
-            "reconciled_hours": r.reconciled_hours,
-            "project": r.project_name,
-            "region": r.region_name,
-            "reminders": r.reminders,
-        }
-        for r in rows
-    ]
 
-    return JSONResponse(
-        sanitize(
+    # Stream rows in chunks and build records plus the status tallies in a
+    # single pass, so a large month never materialises twice (ORM rows +
+    # records) and we don't re-scan the list once per status.
+    status_counts = {
+        "Completed": 0,
+        "Partial": 0,
+        "Mismatch": 0,
+        "Not Completed": 0,
+    }
+    records = []
+    result = db.execute(
+        Q_RECON_REPORT_COLS,
+        {"month": ym},
+        execution_options={"stream_results": True, "yield_per": 500},
+    )
+    for r in result:
+        if r.reconciled_status in status_counts:
+            status_counts[r.reconciled_status] += 1
+        records.append(
             {
-                "year": year,
-                "month": month,
-                "summary": {
-                    "total": total,
-                    "completed": completed,
-                    "partial": partial,
-                    "mismatch": mismatch,
-                    "not_completed": not_completed,
-                },
-                "records": records,
+                "employee_id": r.employee_id,
+                "name": r.name,
+                "email": r.cg_email or r.citi_email,
+                "citi_email": r.citi_email,
+                "project_code": r.project_code,
+                "total_hours": max(
+                    r.total_hours_cg or 0,
+                    r.total_hours_citi or 0,
+                    r.expected_hours or 0,
+                ),
+                "submitted_hours_cg": r.submitted_hours_cg,
+                "submitted_hours_citi": r.submitted_hours_citi,
+                "submitted_on": r.submitted_on_cg,
+                "status_cg": r.status_cg,
+                "status_citi": r.status_citi,
+                "reconciled_status": r.reconciled_status,
+                "reconciled_hours": r.reconciled_hours,
+                "project": r.project_name,
+                "region": r.region_name,
+                "reminders": r.reminders,
             }
         )
+
+    total = len(records)
+    completed = status_counts["Completed"]
+    partial = status_counts["Partial"]
+    mismatch = status_counts["Mismatch"]
+    not_completed = status_counts["Not Completed"]
+
+    return _json_response(
+        {
+            "year": year,
+            "month": month,
+            "summary": {
+                "total": total,
+                "completed": completed,
+                "partial": partial,
+                "mismatch": mismatch,
+                "not_completed": not_completed,
+            },
+            "records": records,
+        }
     )
 
 
 # ----------------- Billing (secured) -----------------
 
 
+@functools.lru_cache(maxsize=256)
+def _annual_projection(month_values: tuple[float, ...], monthly_total: float) -> float:
+    """
+    Linear-regression forecast of the next 12 months, memoized on the trend
+    values themselves — the key changes whenever the data does, so no
+    explicit invalidation is needed.
+    """
+    if len(month_values) >= 2:
+        n = len(month_values)
+        ys = np.asarray(month_values, dtype=np.float64)
+        slope, intercept = np.polyfit(np.arange(n), ys, 1)
+        forecasts = np.maximum(intercept + slope * np.arange(n, n + 12), 0.0)
+        return round(float(forecasts.sum()), 2)
+    return round(monthly_total * 12, 2)
+
+
 @app.get("/api/billing")
 def billing(
     request: Request,
@@ -1260,16 +1704,45 @@ def billing(
     require_login(request)
 
     ym = f"{year:04d}-{month:02d}"
-    q = select(ReconEntry).where(ReconEntry.month == ym)
+    # Detail listing only shows five columns, so skip ORM hydration and
+    # fetch just those as Row tuples.
+    q = select(
+        ReconEntry.name,
+        ReconEntry.cg_email,
+        ReconEntry.citi_email,
+        ReconEntry.project_code,
+        ReconEntry.reconciled_hours,
+        ReconEntry.billing_rate,
+    ).where(ReconEntry.month == ym)
     if project_code:
         q = q.where(ReconEntry.project_code == project_code)
-    current_rows = db.execute(q).scalars().all()
-
-    per_project: dict[str, float] = {}
-    for r in current_rows:
-        pc = r.project_code or "UNKNOWN"
-        amount = (r.reconciled_hours or 0) * (r.billing_rate or 0)
-        per_project[pc] = per_project.get(pc, 0.0) + amount
+    current_rows = db.execute(q).all()
+
+    # Per-project totals come back as O(#projects) rows from one grouped
+    # aggregate instead of summing every employee row in Python.
+    # nullif folds empty-string codes into UNKNOWN, matching the old
+    # `r.project_code or "UNKNOWN"` semantics; group by the same expression
+    # so blank and missing codes land in one bucket.
+    pc_expr = func.coalesce(func.nullif(ReconEntry.project_code, ""), "UNKNOWN")
+    pp_stmt = (
+        select(
+            pc_expr,
+            func.coalesce(
+                func.sum(
+                    func.coalesce(ReconEntry.reconciled_hours, 0.0)
+                    * func.coalesce(ReconEntry.billing_rate, 0.0)
+                ),
+                0.0,
+            ),
+        )
+        .where(ReconEntry.month == ym)
+        .group_by(pc_expr)
+    )
+    if project_code:
+        pp_stmt = pp_stmt.where(ReconEntry.project_code == project_code)
+    per_project: dict[str, float] = {
+        pc: float(total) for pc, total in db.execute(pp_stmt)
+    }
 
     detail = [
         {
@@ -1285,53 +1758,51 @@ def billing(
         for r in current_rows
     ]
 
-    monthly_total = round(sum(per_project.values()), 2)
-
-    # Regression-based annual projection
-    all_months = sorted(set(db.execute(select(ReconEntry.month)).scalars().all()))
-    month_totals = []
-    for ym_str in all_months:
-        q2 = select(ReconEntry).where(ReconEntry.month == ym_str)
-        if project_code:
-            q2 = q2.where(ReconEntry.project_code == project_code)
-        rows2 = db.execute(q2).scalars().all()
-        total2 = sum(
-            (r.reconciled_hours or 0) * (r.billing_rate or 0) for r in rows2
+    # Regression-based annual projection.
+    # One grouped aggregate instead of a query (plus full ORM row
+    # materialisation) per month.
+    trend_stmt = (
+        select(
+            ReconEntry.month,
+            func.sum(
+                func.coalesce(ReconEntry.reconciled_hours, 0.0)
+                * func.coalesce(ReconEntry.billing_rate, 0.0)
+            ),
         )
-        month_totals.append((ym_str, total2))
+        .group_by(ReconEntry.month)
+        .order_by(ReconEntry.month)
+    )
+    if project_code:
+        trend_stmt = trend_stmt.where(ReconEntry.project_code == project_code)
+    totals_by_month = dict(db.execute(trend_stmt).all())
+
+    # The requested month is one entry of the trend aggregate: no separate
+    # re-sum of the per-project dict needed.
+    monthly_total = round(float(totals_by_month.get(ym) or 0.0), 2)
+
+    # Keep every known month on the trend axis, 0.0 where the filtered
+    # project booked nothing — same shape the per-month loop produced.
+    all_months = sorted(
+        set(db.execute(select(ReconEntry.month).distinct()).scalars().all())
+    )
+    month_totals = [
+        (ym_str, float(totals_by_month.get(ym_str) or 0.0)) for ym_str in all_months
+    ]
 
     trend_labels = [m for m, _ in month_totals]
     trend_values = [t for _, t in month_totals]
 
-    annual_projection = monthly_total * 12
-    if len(month_totals) >= 2:
-        xs = list(range(len(month_totals)))
-        ys = trend_values
-        n = len(xs)
-        x_mean = sum(xs) / n
-        y_mean = sum(ys) / n
-        denom = sum((x - x_mean) ** 2 for x in xs)
-        if denom > 0:
-            slope = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / denom
-            intercept = y_mean - slope * x_mean
-            forecasts = [max(intercept + slope * (len(xs) + i), 0.0) for i in range(12)]
-            annual_projection = round(sum(forecasts), 2)
-        else:
-            annual_projection = round(monthly_total * 12, 2)
-    else:
-        annual_projection = round(monthly_total * 12, 2)
+    annual_projection = _annual_projection(tuple(trend_values), monthly_total)
 
-    return JSONResponse(
-        sanitize(
-            {
-                "per_project": per_project,
-                "detail": detail,
-                "monthly_total": monthly_total,
-                "annual_projection": annual_projection,
-                "trend_labels": trend_labels,
-                "trend_values": trend_values,
-            }
-        )
+    return _json_response(
+        {
+            "per_project": per_project,
+            "detail": detail,
+            "monthly_total": monthly_total,
+            "annual_projection": annual_projection,
+            "trend_labels": trend_labels,
+            "trend_values": trend_values,
+        }
     )
 
 
@@ -1343,44 +1814,28 @@ def daily(citi_email: str, year: int, month: int, db: Session = Depends(get_db))
     ym = f"{year:04d}-{month:02d}"
     start, end = month_to_range(ym)
 
-    cg_rows = db.execute(
-        select(CGDaily).where(
-            CGDaily.citi_email == citi_email,
-            CGDaily.date >= start,
-            CGDaily.date <= end,
-        )
-    ).scalars().all()
-
-    ci_rows = db.execute(
-        select(CITIDaily).where(
-            CITIDaily.citi_email == citi_email,
-            CITIDaily.date >= start,
-            CITIDaily.date <= end,
-        )
-    ).scalars().all()
-
-    def to_map(rows):
-        return {r.date.isoformat(): r.hours for r in rows}
-
-    cg_map = to_map(cg_rows)
-    ci_map = to_map(ci_rows)
-
+    # One emulated full-outer-join query; hours for a date are summed across
+    # projects instead of relying on whichever row a dict build saw last.
+    # Rows land in day-of-month-indexed lists, so the calendar fill below is
+    # plain list indexing — no date objects or dict hashing per day.
     _, last = calendar.monthrange(year, month)
-    days = [datetime.date(year, month, d).isoformat() for d in range(1, last + 1)]
-
-    items = []
-    for d in days:
-        h_cg = cg_map.get(d, 0.0)
-        h_ci = ci_map.get(d, 0.0)
-        diff = round(h_cg - h_ci, 2)
-        items.append(
-            {
-                "date": d,
-                "hours_cg": h_cg,
-                "hours_citi": h_ci,
-                "diff": diff,
-            }
-        )
+    cg_hours = [0.0] * (last + 1)
+    ci_hours = [0.0] * (last + 1)
+    params = {"email": citi_email, "start": start, "end": end}
+    for row in db.execute(Q_DAILY_BOTH_SYSTEMS, params):
+        d = row.date.day
+        cg_hours[d] = row.hours_cg or 0.0
+        ci_hours[d] = row.hours_citi or 0.0
+
+    items = [
+        {
+            "date": f"{ym}-{d:02d}",
+            "hours_cg": cg_hours[d],
+            "hours_citi": ci_hours[d],
+            "diff": round(cg_hours[d] - ci_hours[d], 2),
+        }
+        for d in range(1, last + 1)
+    ]
 
     return {"citi_email": citi_email, "items": items}
 
@@ -1389,23 +1844,32 @@ def _trigger_reminders_for_month(db: Session, ym: str, employee_ids=None) -> int
     """Shared reminder logic for REST endpoint and chatbot.
     Returns number of rows updated.
     """
-    rows = db.execute(select(ReconEntry).where(ReconEntry.month == ym)).scalars().all()
-
+    # One UPDATE for the whole month instead of hydrating every row and
+    # letting the ORM emit a per-row statement on commit.
+    stmt = (
+        update(ReconEntry)
+        .where(ReconEntry.month == ym)
+        .values(reminders=func.coalesce(ReconEntry.reminders, 0) + 1)
+    )
     if employee_ids:
         idset = set(map(str, employee_ids))
-        rows = [r for r in rows if (r.employee_id in idset or r.citi_email in idset)]
+        stmt = stmt.where(
+            or_(
+                ReconEntry.employee_id.in_(idset),
+                ReconEntry.citi_email.in_(idset),
+            )
+        )
     else:
-        rows = [
-            r
-            for r in rows
-            if r.reconciled_status in ("Partial", "Mismatch", "Not Completed")
-        ]
+        stmt = stmt.where(
+            ReconEntry.reconciled_status.in_(("Partial", "Mismatch", "Not Completed"))
+        )
 
-    for r in rows:
-        r.reminders = (r.reminders or 0) + 1
+    updated = db.execute(stmt).rowcount
 
     db.commit()
-    return len(rows)
+    if updated:
+        bump_data_version()
+    return updated
 
 
 @app.post("/api/send-reminder")
@@ -1431,27 +1895,30 @@ def list_timeoff(
     year_start = datetime.date(year, 1, 1)
     year_end = datetime.date(year, 12, 31)
 
-    q = select(TimeOff).where(
-        TimeOff.start_date >= year_start,
-        TimeOff.start_date <= year_end,
+    # Join the employee columns in SQL instead of snapshotting the whole
+    # employees table per call. citi_email is normalized at write time on
+    # both models, so plain equality rides the regular email index.
+    # group_by(TimeOff.id) keeps one row per request even if duplicate
+    # employee records share an email, mirroring the old dict's single winner.
+    q = (
+        select(TimeOff, Employee.name, Employee.employee_id)
+        .outerjoin(Employee, Employee.citi_email == TimeOff.citi_email)
+        .where(
+            TimeOff.start_date >= year_start,
+            TimeOff.start_date <= year_end,
+        )
+        .group_by(TimeOff.id)
     )
     if status in ("Pending", "Approved", "Rejected"):
         q = q.where(TimeOff.status == status)
 
-    timeoffs = db.execute(q).scalars().all()
-
-    # Map citi_email -> employee
-    emps = db.execute(select(Employee)).scalars().all()
-    by_email = { (e.citi_email or "").lower(): e for e in emps }
-
     items = []
-    for t in timeoffs:
-        emp = by_email.get((t.citi_email or "").lower())
+    for t, emp_name, emp_id in db.execute(q):
         items.append(
             {
                 "id": t.id,
-                "employee_name": emp.name if emp else None,
-                "employee_id": emp.employee_id if emp else None,
+                "employee_name": emp_name,
+                "employee_id": emp_id,
                 "citi_email": t.citi_email,
                 "leave_type": t.leave_type,
                 "reason": t.reason,
@@ -1471,6 +1938,33 @@ def timeoff_summary(year: int, db: Session = Depends(get_db)):
 
     emps = db.execute(select(Employee)).scalars().all()
 
+    # Two grouped aggregates replace the old two-queries-per-employee loop:
+    # one indexed scan of time_off per status instead of O(2 × employees)
+    # round trips.
+    used_by_email = {
+        email: float(days or 0.0)
+        for email, days in db.execute(
+            select(TimeOff.citi_email, func.sum(func.coalesce(TimeOff.days, 0.0)))
+            .where(
+                TimeOff.status == "Approved",
+                TimeOff.start_date >= year_start,
+                TimeOff.start_date <= year_end,
+            )
+            .group_by(TimeOff.citi_email)
+        )
+    }
+    pending_by_email = dict(
+        db.execute(
+            select(TimeOff.citi_email, func.count())
+            .where(
+                TimeOff.status == "Pending",
+                TimeOff.start_date >= year_start,
+                TimeOff.start_date <= year_end,
+            )
+            .group_by(TimeOff.citi_email)
+        ).all()
+    )
+
     items = []
     total_approved_days = 0.0
     total_pending_requests = 0
@@ -1479,24 +1973,9 @@ def timeoff_summary(year: int, db: Session = Depends(get_db)):
         if not e.citi_email:
             continue
 
-        q = select(TimeOff).where(
-            TimeOff.citi_email == e.citi_email,
-            TimeOff.status == "Approved",
-            TimeOff.start_date >= year_start,
-            TimeOff.start_date <= year_end,
-        )
-        approved = db.execute(q).scalars().all()
-        used = sum(t.days or 0.0 for t in approved)
+        used = used_by_email.get(e.citi_email, 0.0)
         total_approved_days += used
-
-        q_pending = select(TimeOff).where(
-            TimeOff.citi_email == e.citi_email,
-            TimeOff.status == "Pending",
-            TimeOff.start_date >= year_start,
-            TimeOff.start_date <= year_end,
-        )
-        pending = db.execute(q_pending).scalars().all()
-        total_pending_requests += len(pending)
+        total_pending_requests += pending_by_email.get(e.citi_email, 0)
 
         allowance = e.annual_leave_allowance or 15
         remaining = max(allowance - used, 0.0)
@@ -1565,6 +2044,7 @@ def create_timeoff(payload: dict = Body(...), db: Session = Depends(get_db)):
     db.add(t)
     db.commit()
     db.refresh(t)
+    bump_data_version()
 
     return {
         "id": t.id,
@@ -1589,6 +2069,7 @@ def update_timeoff_status(
 
     t.status = status_new
     db.commit()
+    bump_data_version()
     return {"ok": True}
 
 
@@ -1598,8 +2079,9 @@ def summarise_query_result(question: str, sql: str, rows) -> str:
     Take the user question, the SQL that was run, and DB rows,
     and produce a **deterministic** English answer – no LLM here.
     """
-    # rows is a list of Row objects; convert to list[dict]
-    data = [dict(r._mapping) for r in rows]
+    # rows arrive as list[dict] from run_sql_and_fetch; tolerate Row objects
+    # for any direct callers.
+    data = [dict(r._mapping) if hasattr(r, "_mapping") else r for r in rows]
     if not data:
         return (
             "I ran the following query but did not find any matching records:\n\n"
@@ -1704,19 +2186,15 @@ def summarise_query_result(question: str, sql: str, rows) -> str:
     head = data[:10]
     headers = list(head[0].keys())
 
-    table_lines = []
-    # header row
-    table_lines.append("| " + " | ".join(headers) + " |")
-    table_lines.append("| " + " | ".join(["---"] * len(headers)) + " |")
-    for row in head:
-        vals = []
-        for h in headers:
-            v = row.get(h)
-            if isinstance(v, float):
-                vals.append(f"{v:.2f}")
-            else:
-                vals.append(str(v))
-        table_lines.append("| " + " | ".join(vals) + " |")
+    def _fmt(v) -> str:
+        return f"{v:.2f}" if type(v) is float else str(v)
+
+    table_lines = [
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join(["---"] * len(headers)) + " |",
+    ] + [
+        "| " + " | ".join(_fmt(row.get(h)) for h in headers) + " |" for row in head
+    ]
 
     more_note = ""
     if len(data) > len(head):
@@ -1735,24 +2213,15 @@ class ChatRequest(BaseModel):
     project_code: str | None = None
 
 
-@app.post("/api/chat")
-def chat_with_semantic_model(
-    req: ChatRequest,
-    db: Session = Depends(get_db),
-):
+def _chat_pipeline(question: str, project_code: str | None) -> tuple[str, list[dict]]:
     """
-    Semantic chat endpoint:
-    1) Use LLM ONLY to generate SQL.
-    2) Execute SQL safely.
-    3) Summarise deterministically from DB rows (no LLM touching numbers).
+    Shared LLM→SQL→execute steps for the two chat endpoints: generate the
+    SQL (memoized per question/project), run it through the version-keyed
+    result cache, and return (sql, rows). Summarisation stays per-endpoint.
     """
-    question = req.question.strip()
-    project_code = (req.project_code or "").strip() or None
-
-    # 1) Generate SQL via LLM
     try:
         sql = generate_sql_from_question(question, project_code)
-    except HTTPException as e:
+    except HTTPException:
         # propagate our structured error
         raise
     except Exception as e:
@@ -1760,17 +2229,31 @@ def chat_with_semantic_model(
             500, f"Error while generating SQL from question: {e}"
         ) from e
 
-    # 2) Execute SQL safely
     try:
-        result = db.execute(text(sql))
-        rows = result.fetchall()
+        rows = run_sql_and_fetch(sql)
     except Exception as e:
         # Surface SQL + error to the UI, for debugging in hackathon
         raise HTTPException(
             500, f"Failed to execute generated SQL: {e}\n[SQL: {sql}]"
         ) from e
 
-    # 3) Summarise purely from DB rows
+    return sql, rows
+
+
+@app.post("/api/chat")
+def chat_with_semantic_model(req: ChatRequest):
+    """
+    Semantic chat endpoint:
+    1) Use LLM ONLY to generate SQL.
+    2) Execute SQL safely.
+    3) Summarise deterministically from DB rows (no LLM touching numbers).
+    """
+    question = req.question.strip()
+    project_code = (req.project_code or "").strip() or None
+
+    sql, rows = _chat_pipeline(question, project_code)
+
+    # Summarise purely from DB rows
     answer = summarise_query_result(question, sql, rows)
 
     return {
@@ -1783,7 +2266,7 @@ def chat_with_semantic_model(
 
 
 @app.post("/api/chatbot")
-def chatbot_endpoint(payload: dict = Body(...), db: Session = Depends(get_db)):
+def chatbot_endpoint(payload: dict = Body(...)):
     """
     Chatbot flow:
     1) Use LLM to generate a safe SELECT SQL for our schema.
@@ -1800,16 +2283,9 @@ def chatbot_endpoint(payload: dict = Body(...), db: Session = Depends(get_db)):
 
     project_code = payload.get("project_code")
 
-    # Step 1: generate SQL based on the question + schema
-    sql = generate_sql_from_question(question, project_code)
-
-    # Step 2: run SQL on live DB
-    try:
-        rows = run_sql_and_fetch(sql)
-    except Exception as e:
-        raise HTTPException(500, f"Failed to execute generated SQL: {e}")
+    sql, rows = _chat_pipeline(question, project_code)
 
-    # Step 3: summarise answer from rows
+    # Summarise answer from rows via the LLM
     answer = summarise_sql_answer(question, sql, rows)
 
     # We don't automatically send reminders here; that can be a separate endpoint or flow
@@ -1913,59 +2389,63 @@ def create_employee(payload: dict = Body(...), db: Session = Depends(get_db)):
         )
         db.add(e)
 
-    db.commit()
-    db.refresh(e)
+    # Flush (no fsync) so e.id is assigned; the skeleton-row insert below
+    # joins the same transaction and the single commit at the end of the
+    # handler syncs both writes to disk at once. No pre-check SELECT against
+    # the unique email index — let the flush surface the conflict (e.g. the
+    # payload matched an employee by id but claims another record's email).
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "citi_email already belongs to another employee")
 
     # 🔗 Link onboarding/update to timesheet: ensure skeleton row for current month
     if e.citi_email:
         today = datetime.date.today()
         ym = f"{today.year:04d}-{today.month:02d}"
-        exists_recon = db.execute(
-            select(ReconEntry).where(
-                ReconEntry.month == ym, ReconEntry.citi_email == e.citi_email
-            )
-        ).scalar_one_or_none()
-
-        if not exists_recon:
-            expected = expected_hours_for_month(today.year, today.month, None)
-            db.add(
-                ReconEntry(
-                    employee_id=e.employee_id,
-                    month=ym,
-                    name=e.name,
-                    cg_email=e.cg_email,
-                    citi_email=e.citi_email,
-                    region_code=e.region_code,
-                    region_name=e.region_name,
-                    project_name=None,
-                    project_code=e.default_project_code or "UNKNOWN",
-                    billing_rate=e.billing_rate or 0.0,
-                    total_hours_cg=expected,
-                    submitted_hours_cg=0.0,
-                    submitted_on_cg=None,
-                    status_cg="Not Completed",
-                    total_hours_citi=expected,
-                    submitted_hours_citi=0.0,
-                    holidays=None,
-                    status_citi="Not Completed",
-                    expected_hours=expected,
-                    reconciled_hours=0.0,
-                    reconciled_status="Not Completed",
-                    reminders=0,
-                )
+        # (citi_email, month) is uniquely indexed, so let the index probe
+        # answer the existence question on the write itself — ON CONFLICT
+        # DO NOTHING instead of a SELECT round-trip followed by an insert.
+        expected = expected_hours_for_month(today.year, today.month, None)
+        db.execute(
+            sqlite_insert(ReconEntry)
+            .values(
+                {
+                    "employee_id": e.employee_id,
+                    "month": ym,
+                    "name": e.name,
+                    "cg_email": e.cg_email,
+                    "citi_email": e.citi_email,
+                    "region_code": e.region_code,
+                    "region_name": e.region_name,
+                    "project_name": None,
+                    "project_code": e.default_project_code or "UNKNOWN",
+                    "billing_rate": e.billing_rate or 0.0,
+                    "total_hours_cg": expected,
+                    "submitted_hours_cg": 0.0,
+                    "submitted_on_cg": None,
+                    "status_cg": "Not Completed",
+                    "total_hours_citi": expected,
+                    "submitted_hours_citi": 0.0,
+                    "holidays": None,
+                    "status_citi": "Not Completed",
+                    "expected_hours": expected,
+                    "reconciled_hours": 0.0,
+                    "reconciled_status": "Not Completed",
+                    "reminders": 0,
+                }
             )
-            db.commit()
+            .on_conflict_do_nothing()
+        )
 
+    db.commit()
+    bump_data_version()
     return {"id": e.id}
 
 
-@app.put("/api/employees/{emp_id}")
-def update_employee(emp_id: int, payload: dict = Body(...), db: Session = Depends(get_db)):
-    e = db.get(Employee, emp_id)
-    if not e:
-        raise HTTPException(404, "Employee not found")
-
-    for field in [
+_EMPLOYEE_UPDATE_FIELDS = frozenset(
+    (
         "employee_id",
         "name",
         "cg_email",
@@ -1976,12 +2456,23 @@ def update_employee(emp_id: int, payload: dict = Body(...), db: Session = Depend
         "role",
         "manager",
         "status",
-    ]:
-        if field in payload:
-            setattr(e, field, payload[field])
+    )
+)
+
+
+@app.put("/api/employees/{emp_id}")
+def update_employee(emp_id: int, payload: dict = Body(...), db: Session = Depends(get_db)):
+    e = db.get(Employee, emp_id)
+    if not e:
+        raise HTTPException(404, "Employee not found")
+
+    changed = _EMPLOYEE_UPDATE_FIELDS & payload.keys()
+    for field in changed:
+        setattr(e, field, payload[field])
 
     if "billing_rate" in payload:
         e.billing_rate = float(payload["billing_rate"] or 0.0)
+        changed = True
 
     if "start_date" in payload:
         e.start_date = (
@@ -1989,14 +2480,20 @@ def update_employee(emp_id: int, payload: dict = Body(...), db: Session = Depend
             if payload["start_date"]
             else None
         )
+        changed = True
     if "end_date" in payload:
         e.end_date = (
             datetime.date.fromisoformat(payload["end_date"])
             if payload["end_date"]
             else None
         )
+        changed = True
 
-    db.commit()
+    # Nothing recognised in the payload: skip the commit (and its fsync)
+    # and the cache-version bump entirely.
+    if changed:
+        db.commit()
+        bump_data_version()
     return {"ok": True}
 
 
@@ -2010,6 +2507,7 @@ def onboard_employee(emp_id: int, db: Session = Depends(get_db)):
         e.start_date = datetime.date.today()
     e.end_date = None
     db.commit()
+    bump_data_version()
     return {"ok": True}
 
 
@@ -2021,6 +2519,7 @@ def deboard_employee(emp_id: int, db: Session = Depends(get_db)):
     e.status = "Inactive"
     e.end_date = datetime.date.today()
     db.commit()
+    bump_data_version()
     return {"ok": True}
 
 
@@ -2031,22 +2530,20 @@ def deduplicate_employees(db: Session = Depends(get_db)):
     and deletes extra duplicates.
     Call this once via Postman/curl if you already have duplicates.
     """
-    rows = db.execute(select(Employee)).scalars().all()
-    seen_keys = set()
-    to_delete = []
-
-    for e in rows:
-        key = (e.citi_email or "").lower() or (e.employee_id or "")
-        if not key:
-            # treat empty key as unique
-            key = f"__tmp_{e.id}"
-        if key in seen_keys:
-            to_delete.append(e.id)
-        else:
-            seen_keys.add(key)
+    # One statement: keep the lowest id per dedup key (lowercased email,
+    # else employee_id, else the row's own id so keyless rows survive) and
+    # delete the rest — no need to materialise the table in Python.
+    removed = db.execute(
+        text(
+            "DELETE FROM employees WHERE id NOT IN ("
+            "SELECT MIN(id) FROM employees "
+            "GROUP BY COALESCE("
+            "NULLIF(LOWER(citi_email), ''), NULLIF(employee_id, ''), id))"
+        )
+    ).rowcount
 
-    if to_delete:
-        db.execute(Employee.__table__.delete().where(Employee.id.in_(to_delete)))
+    if removed:
         db.commit()
+        bump_data_version()
 
-    return {"removed": len(to_delete)}
+    return {"removed": removed}
@@ -0,0 +1,116 @@
+"""
+Reusable query builders for the hot read paths.
+
+The dashboard-style reads only need a handful of ReconEntry/Employee columns,
+so these helpers attach load_only(...) to avoid dragging the full ~25-column
+rows through the driver and into Python for every request.
+"""
+
+from sqlalchemy import bindparam, func, literal, select, union_all
+from sqlalchemy.orm import load_only
+
+from .db import CGDaily, CITIDaily, Employee, ReconEntry
+
+# Hot statements built once at import: keeping the Select object identity
+# stable lets SQLAlchemy's compiled-statement cache reuse the compiled SQL
+# instead of recompiling on every call in per-employee/per-month loops.
+# Execute with e.g. session.scalars(Q_RECON_BY_EMAIL_MONTH, {"email": ..., "month": ...}).
+Q_RECON_BY_EMAIL_MONTH = select(ReconEntry).where(
+    ReconEntry.citi_email == bindparam("email"),
+    ReconEntry.month == bindparam("month"),
+)
+
+Q_RECON_BY_MONTH = select(ReconEntry).where(ReconEntry.month == bindparam("month"))
+
+# /api/report projection: plain Row tuples for exactly the columns the JSON
+# payload needs — no ORM hydration or identity-map bookkeeping per row.
+Q_RECON_REPORT_COLS = select(
+    ReconEntry.employee_id,
+    ReconEntry.name,
+    ReconEntry.cg_email,
+    ReconEntry.citi_email,
+    ReconEntry.project_code,
+    ReconEntry.total_hours_cg,
+    ReconEntry.total_hours_citi,
+    ReconEntry.expected_hours,
+    ReconEntry.submitted_hours_cg,
+    ReconEntry.submitted_hours_citi,
+    ReconEntry.submitted_on_cg,
+    ReconEntry.status_cg,
+    ReconEntry.status_citi,
+    ReconEntry.reconciled_status,
+    ReconEntry.reconciled_hours,
+    ReconEntry.project_name,
+    ReconEntry.region_name,
+    ReconEntry.reminders,
+).where(ReconEntry.month == bindparam("month"))
+
+Q_EMPLOYEE_BY_CITI_EMAIL = select(Employee).where(
+    Employee.citi_email == bindparam("email")
+)
+
+def _daily_union():
+    # SQLite predates portable FULL OUTER JOIN support, so emulate it:
+    # stack both systems' rows with a zero column for the other side and
+    # aggregate per date. One round trip replaces two selects plus the
+    # Python dict reconciliation.
+    cg = select(
+        CGDaily.date.label("date"),
+        CGDaily.hours.label("h_cg"),
+        literal(0.0).label("h_citi"),
+    ).where(
+        CGDaily.citi_email == bindparam("email"),
+        CGDaily.date >= bindparam("start"),
+        CGDaily.date <= bindparam("end"),
+    )
+    ci = select(
+        CITIDaily.date.label("date"),
+        literal(0.0).label("h_cg"),
+        CITIDaily.hours.label("h_citi"),
+    ).where(
+        CITIDaily.citi_email == bindparam("email"),
+        CITIDaily.date >= bindparam("start"),
+        CITIDaily.date <= bindparam("end"),
+    )
+    u = union_all(cg, ci).subquery("daily_union")
+    return (
+        select(
+            u.c.date,
+            func.sum(u.c.h_cg).label("hours_cg"),
+            func.sum(u.c.h_citi).label("hours_citi"),
+        )
+        .group_by(u.c.date)
+        .order_by(u.c.date)
+    )
+
+
+Q_DAILY_BOTH_SYSTEMS = _daily_union()
+
+
+def recon_summary(month: str):
+    """Status/billing summary columns for one month, nothing else."""
+    return (
+        select(ReconEntry)
+        .where(ReconEntry.month == month)
+        .options(
+            load_only(
+                ReconEntry.citi_email,
+                ReconEntry.expected_hours,
+                ReconEntry.reconciled_hours,
+                ReconEntry.reconciled_status,
+            )
+        )
+    )
+
+
+def employee_lookup():
+    """Employees narrowed to the columns the lookup paths actually use."""
+    return select(Employee).options(
+        load_only(
+            Employee.employee_id,
+            Employee.name,
+            Employee.citi_email,
+            Employee.default_project_code,
+            Employee.billing_rate,
+        )
+    )
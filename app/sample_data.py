@@ -1,10 +1,25 @@
+import functools
 import random
 import calendar
 from datetime import date, timedelta
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+# Prefer xlsxwriter's streaming mode for the write: constant_memory flushes
+# each row to XML instead of holding the whole workbook as objects, which
+# matters for the daily sheets. openpyxl remains the fallback.
+try:
+    import xlsxwriter  # noqa: F401
+
+    _WRITER_KWARGS = {
+        "engine": "xlsxwriter",
+        "engine_kwargs": {"options": {"constant_memory": True}},
+    }
+except ImportError:
+    _WRITER_KWARGS = {"engine": "openpyxl"}
+
 # Fixed portfolio: one of these will be assigned to each employee
 PROJECTS = [
     ("P100", "Payments Core", "EU", "Europe"),
@@ -57,7 +72,9 @@ def random_employees(num: int):
     ]
     lasts = ["Rivera", "Nair", "Chen", "Wu", "Lopez", "Singh", "Patel", "Khan", "Brown", "Smith"]
 
-    random.seed(42)
+    # Local seeded generator: same Mersenne-Twister stream as the old
+    # random.seed(42) module reseed, without mutating global state.
+    rng = random.Random(42)
 
     # Assign projects in a stable, repeated pattern
     project_cycle = []
@@ -67,13 +84,13 @@ def random_employees(num: int):
 
     employees = []
     for i in range(num):
-        f = random.choice(firsts)
-        l = random.choice(lasts)
+        f = rng.choice(firsts)
+        l = rng.choice(lasts)
         name = f"{f} {l}"
         handle = f"{f.lower()}.{l.lower()}{i}"
         cg_email = f"{handle}@capgemini.com"
         citi_email = f"{handle}@citi.com"
-        rate = random.choice([75, 80, 85, 90, 95, 100])
+        rate = rng.choice([75, 80, 85, 90, 95, 100])
         pcode, pname, rcode, rname = project_cycle[i]
 
         employees.append(
@@ -107,28 +124,49 @@ def expected_hours(year: int, month: int, holidays):
     """
     Compute expected hours for the month (Mon–Fri, excluding holidays, 8h/day).
     """
-    holidays = set(holidays or [])
-    _, last = calendar.monthrange(year, month)
+    # Weekday arithmetic from monthrange's first weekday: no date object or
+    # isoformat string per day. Only holidays in this month can match, so
+    # reduce them to day-of-month ints up front.
+    prefix = f"{year:04d}-{month:02d}-"
+    hol_days = {int(h[8:10]) for h in set(holidays or []) if h.startswith(prefix)}
+    first_wd, last = calendar.monthrange(year, month)
     total = 0
     for d in range(1, last + 1):
-        dt = date(year, month, d)
-        if dt.weekday() >= 5 or dt.isoformat() in holidays:
-            continue
-        total += HOURS_PER_DAY
+        if (first_wd + d - 1) % 7 < 5 and d not in hol_days:
+            total += HOURS_PER_DAY
     return total
 
 
-def generate_timeoff_for_month(business_days, probability=0.3):
+@functools.lru_cache(maxsize=None)
+def _month_calendar(year: int, month: int):
+    """
+    Memoized per-month calendar facts: (business_days, expected_hours,
+    holidays). Dates are only constructed for the business days themselves;
+    weekends and holidays are skipped arithmetically.
+    """
+    hols = tuple(month_holidays(year, month))
+    hol_days = {int(h[8:10]) for h in hols}
+    first_wd, last = calendar.monthrange(year, month)
+    business_days = [
+        date(year, month, d)
+        for d in range(1, last + 1)
+        if (first_wd + d - 1) % 7 < 5 and d not in hol_days
+    ]
+    # Expected hours count exactly the business days (Mon–Fri minus holidays)
+    return tuple(business_days), len(business_days) * HOURS_PER_DAY, hols
+
+
+def generate_timeoff_for_month(business_days, probability=0.3, rng=random):
     """
     Optionally generate a contiguous block of 1–3 days time-off in the given month.
     Returns (start_date, end_date) or (None, None).
     """
-    if not business_days or random.random() >= probability:
+    if not business_days or rng.random() >= probability:
         return None, None
 
     # pick a random starting business day and 1–3 working days
-    start_idx = random.randrange(len(business_days))
-    length = random.randint(1, 3)
+    start_idx = rng.randrange(len(business_days))
+    length = rng.randint(1, 3)
     end_idx = min(start_idx + length - 1, len(business_days) - 1)
 
     start = business_days[start_idx]
@@ -148,30 +186,56 @@ def generate_sample_workbook(path: Path, num_employees: int = 10, months_back: i
     employees = random_employees(num_employees)
     months = month_list_last_n(months_back)
 
-    cg_rows = []
-    citi_rows = []
-    cg_daily = []
-    citi_daily = []
+    # Column-wise accumulators (structure-of-arrays): pandas builds typed
+    # columns straight from these lists, with no per-row dicts to allocate
+    # and no type inference across heterogeneous records.
+    cg_cols: dict[str, list] = {
+        k: []
+        for k in (
+            "ID",
+            "Name",
+            "CG Email",
+            "Citi Email",
+            "Total Hours(CG)",
+            "Submitted Hours(CG)",
+            "Submitted On",
+            "Billing Rate",
+            "Region Code",
+            "Region Name",
+            "Project Name",
+            "Project Code",
+            "Month",
+        )
+    }
+    citi_cols: dict[str, list] = {
+        k: []
+        for k in (
+            "Citi Email",
+            "Total Hours(Citi)",
+            "Submitted Hours(Citi)",
+            "Holidays",
+            "Project Code",
+            "Month",
+        )
+    }
+    _DAILY_KEYS = ("Citi Email", "Date", "Hours", "Project Code")
+    cg_daily_cols: dict[str, list] = {k: [] for k in _DAILY_KEYS}
+    citi_daily_cols: dict[str, list] = {k: [] for k in _DAILY_KEYS}
     timeoff_records = []
 
     # We want to guarantee we see all scenarios at least once.
     # We'll force the first employee's first 4 months, then randomise.
     forced_scenarios = ["COMPLETED", "MISMATCH", "PARTIAL", "NOT_COMPLETED"]
 
-    random.seed(123)
+    # Two local generators, one per API family: the stdlib one draws the
+    # same stream the old random.seed(123) reseed did, so output is stable,
+    # and neither touches module-global state (safe to run concurrently).
+    pyrng = random.Random(123)
+    rng = np.random.default_rng(123)
 
     for month_index, ym in enumerate(months):
         year, month = map(int, ym.split("-"))
-        hols = month_holidays(year, month)
-        exp = expected_hours(year, month, hols)
-
-        # All working days for this month
-        _, last = calendar.monthrange(year, month)
-        business_days = [
-            date(year, month, d)
-            for d in range(1, last + 1)
-            if date(year, month, d).weekday() < 5 and date(year, month, d).isoformat() not in hols
-        ]
+        business_days, exp, hols = _month_calendar(year, month)
 
         for emp_index, emp in enumerate(employees):
             eid = emp["employee_id"]
@@ -188,7 +252,7 @@ def generate_sample_workbook(path: Path, num_employees: int = 10, months_back: i
             if emp_index == 0 and month_index < len(forced_scenarios):
                 scenario = forced_scenarios[month_index]
             else:
-                scenario = random.choices(
+                scenario = pyrng.choices(
                     ["COMPLETED", "PARTIAL", "MISMATCH", "NOT_COMPLETED"],
                     weights=[0.5, 0.25, 0.15, 0.1],
                     k=1,
@@ -198,6 +262,7 @@ def generate_sample_workbook(path: Path, num_employees: int = 10, months_back: i
             to_start, to_end = generate_timeoff_for_month(
                 business_days,
                 probability=0.35 if scenario != "NOT_COMPLETED" else 0.15,
+                rng=pyrng,
             )
             if to_start and to_end:
                 timeoff_records.append(
@@ -210,129 +275,98 @@ def generate_sample_workbook(path: Path, num_employees: int = 10, months_back: i
                     }
                 )
 
-            # Build daily hours based on scenario
-            daily_cg = {}
-            daily_ci = {}
-
-            def is_timeoff_day(dt: date) -> bool:
-                if not to_start or not to_end:
-                    return False
-                return to_start <= dt <= to_end
+            # Build daily hours based on scenario — whole-month vectors
+            # instead of a Python branch per day.
+            n_days = len(business_days)
+            bd_arr = np.array(business_days, dtype=object)
+            if to_start and to_end:
+                off_mask = (bd_arr >= to_start) & (bd_arr <= to_end)
+            else:
+                off_mask = np.zeros(n_days, dtype=bool)
 
             if scenario == "NOT_COMPLETED":
                 # No hours at all this month
-                for dt in business_days:
-                    daily_cg[dt] = 0
-                    daily_ci[dt] = 0
+                cg_hours = np.zeros(n_days, dtype=int)
+                ci_hours = cg_hours
 
             elif scenario == "COMPLETED":
                 # Work full days except time-off; Citi mirrors CG
-                for dt in business_days:
-                    if is_timeoff_day(dt):
-                        # leave – no hours
-                        daily_cg[dt] = 0
-                        daily_ci[dt] = 0
-                    else:
-                        daily_cg[dt] = HOURS_PER_DAY
-                        daily_ci[dt] = HOURS_PER_DAY
+                cg_hours = np.where(off_mask, 0, HOURS_PER_DAY)
+                ci_hours = cg_hours
 
             elif scenario == "PARTIAL":
-                # Only some working days are filled; Citi mirrors CG
-                for dt in business_days:
-                    if is_timeoff_day(dt):
-                        daily_cg[dt] = 0
-                        daily_ci[dt] = 0
-                    else:
-                        # 70% chance of working that day
-                        if random.random() < 0.7:
-                            daily_cg[dt] = HOURS_PER_DAY
-                            daily_ci[dt] = HOURS_PER_DAY
-                        else:
-                            daily_cg[dt] = 0
-                            daily_ci[dt] = 0
-
-            elif scenario == "MISMATCH":
-                # CG is mostly full; CITI mirrors but with some random differences
-                for dt in business_days:
-                    if is_timeoff_day(dt):
-                        daily_cg[dt] = 0
-                        daily_ci[dt] = 0
-                    else:
-                        daily_cg[dt] = HOURS_PER_DAY
-                        # mismatch on ~25% of working days
-                        if random.random() < 0.25:
-                            # slightly off, e.g. 4h or 0h
-                            daily_ci[dt] = random.choice([0, 4])
-                        else:
-                            daily_ci[dt] = HOURS_PER_DAY
+                # 70% chance of working each non-leave day; Citi mirrors CG
+                worked = rng.random(n_days) < 0.7
+                cg_hours = np.where(off_mask | ~worked, 0, HOURS_PER_DAY)
+                ci_hours = cg_hours
+
+            else:  # MISMATCH
+                # CG is mostly full; CITI differs on ~25% of working days,
+                # coming in slightly off (4h or 0h)
+                cg_hours = np.where(off_mask, 0, HOURS_PER_DAY)
+                mismatched = rng.random(n_days) < 0.25
+                off_by = rng.choice([0, 4], size=n_days)
+                ci_hours = np.where(
+                    off_mask, 0, np.where(mismatched, off_by, HOURS_PER_DAY)
+                )
 
             # Calculate monthly submitted hours from daily pattern
-            submitted_cg = sum(daily_cg.values())
-            submitted_ci = sum(daily_ci.values())
+            submitted_cg = int(cg_hours.sum())
+            submitted_ci = int(ci_hours.sum())
 
             # CG monthly row
-            cg_rows.append(
-                {
-                    "ID": eid,
-                    "Name": name,
-                    "CG Email": cg_email,
-                    "Citi Email": citi_email,
-                    "Total Hours(CG)": exp,  # theoretical expected
-                    "Submitted Hours(CG)": submitted_cg,
-                    "Submitted On": f"{ym}-18",
-                    "Billing Rate": rate,
-                    "Region Code": rcode,
-                    "Region Name": rname,
-                    "Project Name": pname,
-                    "Project Code": pcode,
-                    "Month": ym,
-                }
-            )
+            cg_cols["ID"].append(eid)
+            cg_cols["Name"].append(name)
+            cg_cols["CG Email"].append(cg_email)
+            cg_cols["Citi Email"].append(citi_email)
+            cg_cols["Total Hours(CG)"].append(exp)  # theoretical expected
+            cg_cols["Submitted Hours(CG)"].append(submitted_cg)
+            cg_cols["Submitted On"].append(f"{ym}-18")
+            cg_cols["Billing Rate"].append(rate)
+            cg_cols["Region Code"].append(rcode)
+            cg_cols["Region Name"].append(rname)
+            cg_cols["Project Name"].append(pname)
+            cg_cols["Project Code"].append(pcode)
+            cg_cols["Month"].append(ym)
 
             # CITI monthly row
-            citi_rows.append(
-                {
-                    "Citi Email": citi_email,
-                    "Total Hours(Citi)": exp,
-                    "Submitted Hours(Citi)": submitted_ci,
-                    "Holidays": ",".join(hols),
-                    "Project Code": pcode,
-                    "Month": ym,
-                }
-            )
-
-            # Daily tables
-            for dt in business_days:
-                h_cg = daily_cg[dt]
-                h_ci = daily_ci[dt]
-                if h_cg > 0:
-                    cg_daily.append(
-                        {
-                            "Citi Email": citi_email,
-                            "Date": dt,
-                            "Hours": h_cg,
-                            "Project Code": pcode,
-                        }
-                    )
-                if h_ci > 0:
-                    citi_daily.append(
-                        {
-                            "Citi Email": citi_email,
-                            "Date": dt,
-                            "Hours": h_ci,
-                            "Project Code": pcode,
-                        }
-                    )
-
-    # Build DataFrames
-    cg_df = pd.DataFrame(cg_rows)
-    citi_df = pd.DataFrame(citi_rows)
-    cg_daily_df = pd.DataFrame(cg_daily)
-    citi_daily_df = pd.DataFrame(citi_daily)
+            citi_cols["Citi Email"].append(citi_email)
+            citi_cols["Total Hours(Citi)"].append(exp)
+            citi_cols["Submitted Hours(Citi)"].append(submitted_ci)
+            citi_cols["Holidays"].append(",".join(hols))
+            citi_cols["Project Code"].append(pcode)
+            citi_cols["Month"].append(ym)
+
+            # Daily tables: slice the worked days out of the month vectors
+            for hours, cols in (
+                (cg_hours, cg_daily_cols),
+                (ci_hours, citi_daily_cols),
+            ):
+                worked = hours > 0
+                n_worked = int(worked.sum())
+                if not n_worked:
+                    continue
+                cols["Citi Email"].extend([citi_email] * n_worked)
+                cols["Date"].extend(bd_arr[worked].tolist())
+                cols["Hours"].extend(hours[worked].tolist())
+                cols["Project Code"].extend([pcode] * n_worked)
+
+    # Build DataFrames column-wise
+    cg_df = pd.DataFrame(cg_cols)
+    citi_df = pd.DataFrame(citi_cols)
+    cg_daily_df = pd.DataFrame(cg_daily_cols)
+    citi_daily_df = pd.DataFrame(citi_daily_cols)
     timeoff_df = pd.DataFrame(timeoff_records)
 
+    # The daily sheets repeat the same handful of email/project strings
+    # ~22x per employee per month; categoricals store one copy plus small
+    # integer codes, shrinking the frames the writer has to walk.
+    for df in (cg_daily_df, citi_daily_df):
+        for col in ("Citi Email", "Project Code"):
+            df[col] = df[col].astype("category")
+
     path.parent.mkdir(parents=True, exist_ok=True)
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+    with pd.ExcelWriter(path, **_WRITER_KWARGS) as writer:
         cg_df.to_excel(writer, sheet_name="CG", index=False)
         citi_df.to_excel(writer, sheet_name="CITI", index=False)
         cg_daily_df.to_excel(writer, sheet_name="CG_DAILY", index=False)
@@ -0,0 +1,41 @@
+import pytest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import raiseload, sessionmaker
+
+from app.db import Base
+
+
+@pytest.fixture
+def db_session():
+    """Session bound to a throwaway in-memory database with the full schema."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    TestSession = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    session = TestSession()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def strict_session(db_session):
+    """
+    Session where any lazy relationship load raises instead of silently
+    issuing an extra SELECT. The models have no relationships yet, but once
+    Employee/ReconEntry/TimeOff links appear this makes N+1 patterns fail
+    loudly at test time instead of shipping.
+    """
+
+    @event.listens_for(db_session, "do_orm_execute")
+    def _raise_on_lazy_load(execute_state):
+        if (
+            execute_state.is_select
+            and not execute_state.is_column_load
+            and not execute_state.is_relationship_load
+        ):
+            execute_state.statement = execute_state.statement.options(raiseload("*"))
+
+    return db_session
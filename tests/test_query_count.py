@@ -0,0 +1,22 @@
+from sqlalchemy import select
+
+from app.db import ReconEntry
+from app.db_debug import count_queries
+
+
+def test_count_queries_records_statements(strict_session):
+    with count_queries(strict_session) as queries:
+        strict_session.execute(
+            select(ReconEntry).where(ReconEntry.month == "2025-11")
+        ).scalars().all()
+
+    assert len(queries) == 1
+    assert queries[0].lstrip().upper().startswith("SELECT")
+
+
+def test_count_queries_detaches_listener(strict_session):
+    with count_queries(strict_session) as queries:
+        pass
+
+    strict_session.execute(select(ReconEntry)).scalars().all()
+    assert queries == []